@@ -0,0 +1,103 @@
+"""Move tasks completed long ago, with their comments, out of the tasks and comments tables.
+
+Open-task lists and project pages only ever read the hot tables, so keeping finished work elsewhere keeps
+them (and their indexes) small. Archived tasks stay visible from their project page. Run it from cron:
+
+    flask --app main archive-tasks --days 30
+"""
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import event, select, insert, delete, literal
+
+from models import db, Task, Comment, ArchivedTask, ArchivedComment
+from versions import bump_versions
+
+# Tasks (with all their comments) moved per transaction
+BATCH_SIZE = 500
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@event.listens_for(Task.is_complete, "set")
+def stamp_completed_at(task, value, old_value, initiator):
+
+    # Remember when the task was completed (the bulk API sets completed_at itself)
+    if value and old_value is not True:
+        task.completed_at = utcnow()
+    elif not value:
+        task.completed_at = None
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """Archive up to batch_size tasks completed before cutoff and return how many were moved. The caller commits."""
+
+    tasks = db.session.execute(
+        select(Task.id, Task.project_id)
+        .where(Task.is_complete == True, Task.completed_at < cutoff)
+        .order_by(Task.completed_at, Task.id)
+        .limit(batch_size)
+    ).all()
+    if not tasks:
+        return 0
+
+    task_ids = [task_id for task_id, _ in tasks]
+
+    # Copy the tasks, then their comments pointing at the archived copies, then delete the originals
+    archived_ids = db.session.scalars(
+        insert(ArchivedTask)
+        .from_select(
+            ["task_id", "task_text", "due_date", "completed_at", "archived_at", "creator_id", "assignee_id", "project_id"],
+            select(Task.id, Task.task_text, Task.due_date, Task.completed_at, literal(utcnow()), Task.creator_id, Task.assignee_id, Task.project_id)
+            .where(Task.id.in_(task_ids)),
+        )
+        .returning(ArchivedTask.id)
+    ).all()
+
+    db.session.execute(
+        insert(ArchivedComment).from_select(
+            ["comment_text", "comment_author_id", "task_id"],
+            select(Comment.comment_text, Comment.comment_author_id, ArchivedTask.id)
+            .join(ArchivedTask, ArchivedTask.task_id == Comment.task_id)
+            .where(ArchivedTask.id.in_(archived_ids))
+            .order_by(Comment.id),
+        )
+    )
+
+    db.session.execute(delete(Comment).where(Comment.task_id.in_(task_ids)), execution_options={"synchronize_session": False})
+    db.session.execute(delete(Task).where(Task.id.in_(task_ids)), execution_options={"synchronize_session": False})
+
+    # The project members and task counters include archived tasks, so only the project pages change
+    bump_versions(db.session.connection(), {project_id for _, project_id in tasks})
+
+    return len(tasks)
+
+
+def archive_completed_tasks(days, batch_size=BATCH_SIZE):
+
+    # Archive every task completed more than `days` days ago, committing after each batch
+    cutoff = utcnow() - timedelta(days=days)
+    total = 0
+
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        db.session.commit()
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def init_app(app):
+
+    @app.cli.command("archive-tasks")
+    @click.option("--days", type=int, help="Archive tasks completed more than this many days ago (default: ARCHIVE_AFTER_DAYS).")
+    @click.option("--batch-size", type=int, default=BATCH_SIZE, show_default=True)
+    def archive_tasks(days, batch_size):
+        """Move long-completed tasks and their comments to the archive tables."""
+        if days is None:
+            days = current_app.config["ARCHIVE_AFTER_DAYS"]
+
+        click.echo(f"archived {archive_completed_tasks(days, batch_size)} tasks")
@@ -0,0 +1,239 @@
+"""ASGI entry point, for serving many slow clients or long database waits from few processes.
+
+    gunicorn --worker-class uvicorn.workers.UvicornWorker --workers 4 "asgi:create_app()"
+
+GETs of the read-heavy pages in ASYNC_ENDPOINTS run on the event loop: the unchanged Flask views run
+in a greenlet (AsyncSession.run_sync) on an async engine, so while one request waits for the database
+the worker serves others, and concurrent requests share a connection pool instead of a thread each.
+The session cookie, Flask-Login, CSRF tokens, page caching and replica routing work exactly as under
+WSGI because the request still goes through the Flask app.
+
+Every other request runs the Flask app in a pool of ASGI_THREADS threads, as a threaded WSGI server
+would.
+
+Uses uvicorn and the async driver for the database (aiosqlite for SQLite, asyncpg for Postgres), all in
+requirements.txt. ASYNC_DB_URI overrides the async URL of the primary database.
+"""
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import main
+from models import db
+from routing import RoutingSession
+
+# Views served on the event loop (they only read, so they never hold a transaction across requests)
+ASYNC_ENDPOINTS = {"show_project", "show_task", "get_current_user_tasks"}
+
+# Async driver for each database the app supports
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+ASYNC_SESSION = "todo.async_session"
+
+
+def async_url(url):
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {backend}; set ASYNC_DB_URI")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+class AsyncRoutingSession(RoutingSession):
+
+    # Picks the primary or the replica as the WSGI session does, then uses that database's async engine
+    def __init__(self, db, async_engines, **kwargs):
+        super().__init__(db, **kwargs)
+        self._async_engines = async_engines
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        return self._async_engines[engine].sync_engine if engine in self._async_engines else engine
+
+
+def build_environ(scope, body):
+
+    # The WSGI environ for an ASGI HTTP request (PEP 3333 strings are latin-1)
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1")
+        if name == "content-length":
+            key = "CONTENT_LENGTH"
+        elif name == "content-type":
+            key = "CONTENT_TYPE"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+
+def _start_message(status, headers):
+    return {
+        "type": "http.response.start",
+        "status": int(status.split(" ", 1)[0]),
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    }
+
+
+class AsgiApp:
+    """Serve a Flask app made by main.create_app over ASGI."""
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=app.config["ASGI_THREADS"], thread_name_prefix="wsgi")
+        self.async_engines = None
+
+        with app.app_context():
+            self.engines = dict(db.engines)
+
+        @app.before_request
+        def use_async_session():
+
+            # Requests dispatched on the event loop bring the session of their greenlet
+            if ASYNC_SESSION in request.environ:
+                db.session.registry.set(request.environ[ASYNC_SESSION])
+
+    def _get_async_engines(self):
+
+        # Created in the worker process on first use, like the sync engines' connections
+        if self.async_engines is None:
+            options = {"pool_size": self.app.config["ASYNC_POOL_SIZE"], "max_overflow": self.app.config["ASYNC_MAX_OVERFLOW"]}
+            self.async_engines = {}
+            for key, engine in self.engines.items():
+                url = self.app.config["ASYNC_DB_URI"] if key is None and self.app.config["ASYNC_DB_URI"] else async_url(engine.url)
+                self.async_engines[engine] = create_async_engine(url, **options)
+        return self.async_engines
+
+    def _is_async(self, environ):
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            return False
+
+        adapter = self.app.url_map.bind_to_environ(environ)
+        try:
+            endpoint, _ = adapter.match()
+        except Exception:
+            # Not found, redirects and the like are left to Flask
+            return False
+
+        return endpoint in ASYNC_ENDPOINTS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            raise ValueError(f"unsupported ASGI scope {scope['type']}")
+
+        body = []
+        while True:
+            message = await receive()
+            body.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+
+        environ = build_environ(scope, b"".join(body))
+
+        if self._is_async(environ):
+            await self._run_on_loop(environ, send)
+        else:
+            await self._run_in_thread(environ, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for engine in (self.async_engines or {}).values():
+                    await engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _run_on_loop(self, environ, send):
+        response = {}
+
+        def run(sync_session):
+            environ[ASYNC_SESSION] = sync_session
+
+            def start_response(status, headers, exc_info=None):
+                response["start"] = _start_message(status, headers)
+
+            result = self.app.wsgi_app(environ, start_response)
+            try:
+                # These pages are rendered whole, so the body is already in memory
+                response["body"] = b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        async with AsyncSession(sync_session_class=AsyncRoutingSession, db=db, async_engines=self._get_async_engines()) as session:
+            await session.run_sync(run)
+
+        await send(response["start"])
+        await send({"type": "http.response.body", "body": response["body"]})
+
+    async def _run_in_thread(self, environ, send):
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started["message"] = _start_message(status, headers)
+
+            result = self.app.wsgi_app(environ, start_response)
+            try:
+                # Stream the body (exports are generated while they are sent)
+                for chunk in result:
+                    if chunk:
+                        if started:
+                            send_from_thread(started.pop("message"))
+                        send_from_thread({"type": "http.response.body", "body": chunk, "more_body": True})
+                if started:
+                    send_from_thread(started.pop("message"))
+                send_from_thread({"type": "http.response.body", "body": b""})
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        await loop.run_in_executor(self.executor, run)
+
+
+def create_app(config=None):
+    """main.create_app() served over ASGI; the settings below can be passed in config too."""
+
+    config = dict(config or {})
+    config.setdefault("ASGI_THREADS", int(os.getenv("ASGI_THREADS", 16)))
+    config.setdefault("ASYNC_POOL_SIZE", int(os.getenv("ASYNC_POOL_SIZE", 20)))
+    config.setdefault("ASYNC_MAX_OVERFLOW", int(os.getenv("ASYNC_MAX_OVERFLOW", 10)))
+    config.setdefault("ASYNC_DB_URI", os.getenv("ASYNC_DB_URI"))
+
+    return AsgiApp(main.create_app(config))
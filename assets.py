@@ -0,0 +1,249 @@
+"""Fingerprinted, precompressed static files.
+
+`flask --app main build-assets` copies everything under static/ to static/dist/ with a hash of its
+contents in the name (css/styles.css becomes dist/css/styles.1a2b3c4d5e6f.css), minifies the CSS,
+writes gzip and brotli copies of text files next to them, and renders the hero photo at several widths
+as WebP and JPEG. static/dist/manifest.json maps each source file to its built copy.
+
+Templates link files with asset_url() and images with asset_srcset(); built files are served with
+their precompressed copy when the browser accepts it and cached for a year as immutable, since a
+change to a file changes its name. Before the first build both fall back to the plain files.
+
+Brotli copies need the brotli package and image variants need Pillow; without them the build skips
+those steps.
+"""
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+import click
+from flask import current_app, request, url_for
+
+BUILD_DIRECTORY = "dist"
+MANIFEST = "manifest.json"
+
+# Files worth compressing (images are compressed already)
+COMPRESSIBLE = {".css", ".js", ".svg", ".ico", ".json", ".txt", ".map"}
+
+# Widths rendered for each responsive image, and the encoder settings per format
+RESPONSIVE_IMAGES = {
+    "assets/andrej-lisakov-3A4XZUopCJA-unsplash.jpg": (480, 960, 1440, 1920, 2560),
+}
+IMAGE_FORMATS = {
+    "image/webp": ("WEBP", ".webp", {"quality": 75, "method": 6}),
+    "image/jpeg": ("JPEG", ".jpg", {"quality": 80, "optimize": True, "progressive": True}),
+}
+
+# Strings are kept as they are, comments dropped, and runs of whitespace collapsed
+_CSS_TOKEN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/|(\s+)""", re.S)
+_CSS_PUNCTUATION = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|\s*([{};,>])\s*""")
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def minify_css(css):
+
+    # Only removes what can't change the meaning (whitespace around a ":" can, e.g. "a :hover")
+    css = _CSS_TOKEN.sub(lambda match: match.group(1) or (" " if match.group(2) else ""), css)
+    css = _CSS_PUNCTUATION.sub(lambda match: match.group(1) or match.group(2), css)
+
+    return css.replace(";}", "}").strip()
+
+
+def _fingerprint(path, data):
+    stem, extension = posixpath.splitext(path)
+    return f"{BUILD_DIRECTORY}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+
+def _rewrite_css_urls(css, css_path, files):
+
+    # Point url(...) references at the built copies (relative to the built stylesheet)
+    directory = posixpath.dirname(css_path)
+
+    def replace(match):
+        reference = match.group(2)
+        if ":" in reference or reference.startswith(("/", "#")):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(directory, reference.split("?")[0].split("#")[0]))
+        if target not in files:
+            return match.group(0)
+        return f"url('{posixpath.relpath(files[target]['path'], posixpath.join(BUILD_DIRECTORY, directory))}')"
+
+    return _CSS_URL.sub(replace, css)
+
+
+def _write(static_folder, path, data):
+    target = os.path.join(static_folder, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as file:
+        file.write(data)
+
+
+def _compress(static_folder, path, data):
+
+    # Returns the encodings written next to the file
+    if posixpath.splitext(path)[1] not in COMPRESSIBLE:
+        return []
+
+    encodings = []
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        _write(static_folder, path + ".gz", compressed)
+        encodings.append("gzip")
+
+    try:
+        import brotli
+    except ImportError:
+        return encodings
+
+    compressed = brotli.compress(data, quality=11)
+    if len(compressed) < len(data):
+        _write(static_folder, path + ".br", compressed)
+        encodings.append("br")
+
+    return encodings
+
+
+def _render_variants(static_folder, path, widths):
+
+    # Returns {content type: [[width, built path], ...]} with the widths that don't upscale the image
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return {}
+
+    with Image.open(os.path.join(static_folder, path)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    variants = {}
+    for content_type, (image_format, extension, options) in IMAGE_FORMATS.items():
+        variants[content_type] = []
+        for width in sorted(width for width in widths if width <= image.width):
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS, reducing_gap=3.0)
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            data = buffer.getvalue()
+            built = _fingerprint(f"{posixpath.splitext(path)[0]}-{width}w{extension}", data)
+            _write(static_folder, built, data)
+            variants[content_type].append([width, built])
+
+    return variants
+
+
+def _source_files(static_folder):
+    for directory, directories, filenames in os.walk(static_folder):
+        relative = posixpath.relpath(directory.replace(os.sep, "/"), static_folder.replace(os.sep, "/"))
+        if relative == BUILD_DIRECTORY:
+            directories.clear()
+            continue
+        for filename in sorted(filenames):
+            yield filename if relative == "." else f"{relative}/{filename}"
+
+
+def build(static_folder):
+    """Build static/dist and its manifest from the files in static_folder; returns the manifest."""
+
+    shutil.rmtree(os.path.join(static_folder, BUILD_DIRECTORY), ignore_errors=True)
+
+    # Stylesheets last, so the files they reference already have their built names
+    sources = sorted(_source_files(static_folder), key=lambda path: (path.endswith(".css"), path))
+    files = {}
+
+    for path in sources:
+        with open(os.path.join(static_folder, path), "rb") as file:
+            data = file.read()
+
+        if path.endswith(".css"):
+            data = minify_css(_rewrite_css_urls(data.decode("utf-8"), path, files)).encode("utf-8")
+
+        built = _fingerprint(path, data)
+        _write(static_folder, built, data)
+        files[path] = {"path": built, "encodings": _compress(static_folder, built, data)}
+
+    images = {}
+    for path, widths in RESPONSIVE_IMAGES.items():
+        if path in files:
+            images[path] = _render_variants(static_folder, path, widths)
+
+    manifest = {"files": files, "images": images}
+    _write(static_folder, posixpath.join(BUILD_DIRECTORY, MANIFEST), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, BUILD_DIRECTORY, MANIFEST)) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return {"files": {}, "images": {}, "built": {}}
+
+    # Built path -> encodings, for serving
+    manifest["built"] = {entry["path"]: entry["encodings"] for entry in manifest["files"].values()}
+    for variants in manifest["images"].values():
+        for sizes in variants.values():
+            manifest["built"].update((path, []) for _, path in sizes)
+
+    return manifest
+
+
+def asset_url(filename, **values):
+
+    # url_for("static", filename=...) for the built copy of a file, or the file itself before a build
+    entry = current_app.extensions["assets"]["files"].get(filename)
+    return url_for("static", filename=entry["path"] if entry else filename, **values)
+
+
+def asset_srcset(filename, content_type):
+
+    # "url 480w, url 960w, ..." for an image in RESPONSIVE_IMAGES, or "" before a build
+    sizes = current_app.extensions["assets"]["images"].get(filename, {}).get(content_type, [])
+    return ", ".join(f"{url_for('static', filename=path)} {width}w" for width, path in sizes)
+
+
+def serve_static(filename):
+
+    # Built files never change, so they are cached for good; everything else is served as Flask would
+    encodings = current_app.extensions["assets"]["built"].get(filename)
+    if encodings is None:
+        return current_app.send_static_file(filename)
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = next((encoding for encoding in ("br", "gzip") if encoding in encodings and request.accept_encodings[encoding]), None)
+    suffix = {"br": ".br", "gzip": ".gz", None: ""}[encoding]
+
+    response = current_app.send_static_file(filename + suffix)
+    response.mimetype = mimetype
+    if encoding:
+        response.content_encoding = encoding
+    if encodings:
+        response.vary.add("Accept-Encoding")
+
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["ASSETS_MAX_AGE"]
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+
+    return response
+
+
+def init_app(app):
+
+    app.config.setdefault("ASSETS_MAX_AGE", 365 * 24 * 3600)
+
+    app.extensions["assets"] = load_manifest(app.static_folder)
+    app.view_functions["static"] = serve_static
+    app.jinja_env.globals.update(asset_url=asset_url, asset_srcset=asset_srcset)
+
+    @app.cli.command("build-assets")
+    def build_assets():
+        """Fingerprint and compress the static files and render the responsive images."""
+        manifest = build(app.static_folder)
+        app.extensions["assets"] = load_manifest(app.static_folder)
+
+        click.echo(f"built {len(manifest['files'])} files and {sum(len(sizes) for variants in manifest['images'].values() for sizes in variants.values())} image variants")
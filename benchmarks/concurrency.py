@@ -0,0 +1,213 @@
+"""Compare how the sync and ASGI (see asgi.py) gunicorn servers hold up under concurrent load.
+
+Seeds a database, starts each server with the same number of worker processes, and for each
+concurrency level keeps that many clients requesting the ASGI read routes (project, task and assigned
+task pages) for a fixed time. Reports throughput and p50/p99 latency per server and level as JSON:
+
+    python -m benchmarks.concurrency --workers 2 --concurrency 1,16,64 --output results.json
+
+--slow-clients keeps that many extra connections open that trickle their request headers in, as slow
+mobile clients do; a sync worker is stuck with each of them until it times out.
+
+The database defaults to a fresh SQLite file in a temporary directory; set --db-uri to benchmark
+against Postgres (the database should be empty, and asyncpg installed).
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import seed as seed_module
+from benchmarks.run import git_commit, percentile
+
+SERVERS = {
+    "sync": lambda workers, port: [
+        sys.executable, "-m", "gunicorn", "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "main:create_app()"
+    ],
+    "asgi": lambda workers, port: [
+        sys.executable, "-m", "gunicorn", "--worker-class", "uvicorn.workers.UvicornWorker", "--workers", str(workers),
+        "--bind", f"127.0.0.1:{port}", "asgi:create_app()"
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/login")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def trickle(port, stop):
+
+    # A client that sends one header byte per second and never finishes its request
+    request = b"GET /login HTTP/1.1\r\nHost: localhost\r\nX-Slow: " + b"x" * 1000
+    try:
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            for byte in request:
+                if stop.wait(1):
+                    return
+                sock.sendall(bytes([byte]))
+    except OSError:
+        pass
+
+
+def load(port, cookies, urls, concurrency, duration, random_seed):
+
+    # `concurrency` clients, each on its own keep-alive connection, requesting until the time is up
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = []
+
+    def client(number):
+        rng = random.Random(random_seed + number)
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.monotonic() < deadline:
+            user_id, url = rng.choice(urls)
+            started = time.perf_counter()
+            try:
+                connection.request("GET", url, headers={"Cookie": cookies[user_id]})
+                response = connection.getresponse()
+                response.read()
+            except OSError as error:
+                errors.append(repr(error))
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status >= 400:
+                errors.append(f"{url} returned {response.status}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+    }
+
+
+def run_server(name, args, env, cookies, urls):
+    port = free_port()
+    server = subprocess.Popen(SERVERS[name](args.workers, port), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stop = threading.Event()
+    try:
+        wait_until_up(port)
+
+        slow_clients = [threading.Thread(target=trickle, args=(port, stop), daemon=True) for _ in range(args.slow_clients)]
+        for thread in slow_clients:
+            thread.start()
+        # Let the slow clients connect before the load starts
+        time.sleep(1 if slow_clients else 0)
+
+        return {
+            str(concurrency): load(port, cookies, urls, concurrency, args.duration, args.seed)
+            for concurrency in args.concurrency
+        }
+    finally:
+        stop.set()
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    seed_module.add_arguments(parser)
+    parser.add_argument("--db-uri", help="database to seed and benchmark (default: a temporary SQLite file)")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes per server")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--slow-clients", type=int, default=0, help="extra connections that never finish their request")
+    parser.add_argument("--servers", default="sync,asgi", help="servers to benchmark, of: " + ", ".join(SERVERS))
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    # The servers read their configuration from the environment when they create the app
+    os.environ["DB_URI"] = args.db_uri or f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["SLOW_REQUEST_THRESHOLD"] = "inf"
+
+    from main import create_app
+    from models import db, Project, Task
+
+    app = create_app()
+    with app.app_context():
+        sizes = seed_module.seed(db, args.users, args.projects, args.tasks, args.comments, args.seed)
+        database = db.engine.dialect.name
+        projects = db.session.execute(db.select(Project.id, Project.creator_id)).all()
+        tasks = db.session.execute(db.select(Task.id, Task.assignee_id).where(Task.is_complete == False)).all()
+
+    # The read routes served on the event loop by asgi.py, as the users allowed to see them
+    urls = (
+        [(project.creator_id, f"/show-project/{project.id}") for project in projects]
+        + [(task.assignee_id, f"/task/{task.id}") for task in tasks]
+        + [(task.assignee_id, "/current-user-tasks") for task in tasks]
+    )
+
+    # Log everyone in by signing their session cookies directly
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookies = {
+        user_id: f"{app.config['SESSION_COOKIE_NAME']}={serializer.dumps({'_user_id': str(user_id), '_fresh': True})}"
+        for user_id in {user_id for user_id, _ in urls}
+    }
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "database": database,
+            "python": platform.python_version(),
+            "dataset": sizes,
+            "workers": args.workers,
+            "duration_s": args.duration,
+            "slow_clients": args.slow_clients,
+        },
+        "results": {name: run_server(name, args, os.environ, cookies, urls) for name in args.servers.split(",")},
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    print(f"{'server':<8}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}", file=sys.stderr)
+    for name, levels in results["results"].items():
+        for concurrency, result in levels.items():
+            print(
+                f"{name:<8}{concurrency:>8}{result['throughput_rps']:>10.1f}"
+                f"{result['p50_ms'] or 0:>10.1f}{result['p99_ms'] or 0:>10.1f}{result['errors']:>8}",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
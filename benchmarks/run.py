@@ -0,0 +1,206 @@
+"""Seed a database and drive the app's routes through the Flask test client.
+
+Reports throughput, p50/p99 latency and SQL statements per request for each route as JSON, so the
+numbers from two commits can be compared:
+
+    python -m benchmarks.run --output before.json
+    git checkout <other commit>
+    python -m benchmarks.run --output after.json --compare before.json
+
+The database defaults to a fresh SQLite file in a temporary directory; set --db-uri to benchmark
+against Postgres (the database should be empty).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks import seed as seed_module
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Benchmark:
+
+    def __init__(self, app, db, requests_per_route, random_seed):
+        self.app = app
+        self.db = db
+        self.requests_per_route = requests_per_route
+        self.rng = random.Random(random_seed)
+        self.clients = {}
+        self.statement_count = 0
+
+        from sqlalchemy import event
+
+        with app.app_context():
+            @event.listens_for(db.engine, "before_cursor_execute")
+            def count_statement(*args, **kwargs):
+                self.statement_count += 1
+
+    def client(self, user_id):
+
+        # One logged in test client per user
+        if user_id not in self.clients:
+            client = self.app.test_client()
+            with client.session_transaction() as session:
+                session["_user_id"] = str(user_id)
+                session["_fresh"] = True
+            self.clients[user_id] = client
+
+        return self.clients[user_id]
+
+    def measure(self, name, make_request):
+
+        latencies = []
+        statements = []
+        started = time.perf_counter()
+
+        for _ in range(self.requests_per_route):
+            method, user_id, url, data = make_request()
+            client = self.client(user_id)
+
+            self.statement_count = 0
+            request_started = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            latencies.append(time.perf_counter() - request_started)
+            statements.append(self.statement_count)
+
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: {method} {url} returned {response.status_code}")
+
+        elapsed = time.perf_counter() - started
+
+        return {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+            "mean_queries": round(statistics.fmean(statements), 2),
+            "max_queries": max(statements),
+        }
+
+    def run(self):
+
+        from models import Project, Task
+
+        with self.app.app_context():
+            projects = self.db.session.execute(self.db.select(Project.id, Project.creator_id)).all()
+            tasks = self.db.session.execute(self.db.select(Task.id, Task.project_id, Task.assignee_id, Task.creator_id)).all()
+            assignees = sorted({task.assignee_id for task in tasks})
+
+        due_date = (date.today() + timedelta(days=7)).isoformat()
+
+        def random_project():
+            project = self.rng.choice(projects)
+            return "GET", project.creator_id, f"/show-project/{project.id}", None
+
+        def random_task():
+            task = self.rng.choice(tasks)
+            return "GET", task.assignee_id, f"/task/{task.id}", None
+
+        def assigned_tasks():
+            return "GET", self.rng.choice(assignees), "/current-user-tasks", None
+
+        def user_projects():
+            return "GET", self.rng.choice(assignees), "/current-user-projects", None
+
+        def new_task():
+            project = self.rng.choice(projects)
+            data = {"task": "Benchmark task", "due_date": due_date, "assignee": str(project.creator_id)}
+            return "POST", project.creator_id, f"/new-task/{project.id}", data
+
+        def mark_task():
+            task = self.rng.choice(tasks)
+            return "GET", task.assignee_id, f"/mark-task/{task.id}?project_id={task.project_id}", None
+
+        return {
+            "show_project": self.measure("show_project", random_project),
+            "show_task": self.measure("show_task", random_task),
+            "get_current_user_tasks": self.measure("get_current_user_tasks", assigned_tasks),
+            "get_current_user_projects": self.measure("get_current_user_projects", user_projects),
+            "add_new_task": self.measure("add_new_task", new_task),
+            "mark_task": self.measure("mark_task", mark_task),
+        }
+
+
+def compare(previous, current):
+
+    # Print how each route changed relative to an earlier results file
+    print(f"{'route':<28}{'p50 ms':>18}{'p99 ms':>18}{'queries':>14}")
+    for route, result in current["results"].items():
+        before = previous["results"].get(route)
+        if before is None:
+            continue
+        print(
+            f"{route:<28}"
+            f"{before['p50_ms']:>8.2f} -> {result['p50_ms']:<7.2f}"
+            f"{before['p99_ms']:>8.2f} -> {result['p99_ms']:<7.2f}"
+            f"{before['mean_queries']:>6.1f} -> {result['mean_queries']:<5.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    seed_module.add_arguments(parser)
+    parser.add_argument("--db-uri", help="database to seed and benchmark (default: a temporary SQLite file)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    # The app reads its configuration from the environment when it is created
+    os.environ["DB_URI"] = args.db_uri or f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    from main import create_app
+    from models import db
+
+    app = create_app({"WTF_CSRF_ENABLED": False, "SLOW_REQUEST_THRESHOLD": float("inf")})
+
+    with app.app_context():
+        sizes = seed_module.seed(db, args.users, args.projects, args.tasks, args.comments, args.seed)
+        database = db.engine.dialect.name
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "database": database,
+            "python": platform.python_version(),
+            "dataset": sizes,
+            "requests_per_route": args.requests,
+        },
+        "results": Benchmark(app, db, args.requests, args.seed).run(),
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Fill a database with synthetic users, projects, tasks and comments for benchmarking.
+
+Usage (from the repository root):
+
+    DB_URI=sqlite:////tmp/bench.db python -m benchmarks.seed --users 200 --projects 50 --tasks 100 --comments 3
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from werkzeug.security import generate_password_hash
+
+# Rows per INSERT batch
+BATCH_SIZE = 5000
+
+
+def _insert(db, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+
+
+def seed(db, users=200, projects=50, tasks_per_project=100, comments_per_task=3, random_seed=0):
+
+    # Import here so DB_URI can be set before the app is created
+    from models import User, Project, Task, Comment
+    from membership import refresh_project_members
+    from counters import refresh_task_counts
+
+    rng = random.Random(random_seed)
+    today = date.today()
+
+    # Every user gets the same password so benchmarks can log in as anyone
+    password = generate_password_hash("password", method="pbkdf2:sha256", salt_length=8)
+
+    db.create_all()
+
+    _insert(db, User, [
+        {"id": user_id, "email": f"user{user_id}@example.com", "name": f"User {user_id}", "password": password}
+        for user_id in range(1, users + 1)
+    ])
+
+    _insert(db, Project, [
+        {
+            "id": project_id,
+            "title": f"Project {project_id}",
+            "description": f"<p>Synthetic project {project_id}</p>",
+            "date": today - timedelta(days=rng.randint(0, 365)),
+            "creator_id": rng.randint(1, users),
+        }
+        for project_id in range(1, projects + 1)
+    ])
+    project_creators = dict(db.session.execute(db.select(Project.id, Project.creator_id)).all())
+
+    task_rows = []
+    for project_id in range(1, projects + 1):
+        for _ in range(tasks_per_project):
+            task_rows.append({
+                "id": len(task_rows) + 1,
+                "task_text": f"Task {len(task_rows) + 1}",
+                "due_date": today + timedelta(days=rng.randint(-30, 90)),
+                "is_complete": rng.random() < 0.3,
+                "creator_id": project_creators[project_id],
+                "assignee_id": rng.randint(1, users),
+                "project_id": project_id,
+            })
+    _insert(db, Task, task_rows)
+
+    comment_rows = []
+    for task in task_rows:
+        for _ in range(comments_per_task):
+            comment_rows.append({
+                "id": len(comment_rows) + 1,
+                "comment_text": f"<p>Comment {len(comment_rows) + 1}</p>",
+                "comment_author_id": rng.choice((task["creator_id"], task["assignee_id"])),
+                "task_id": task["id"],
+            })
+    _insert(db, Comment, comment_rows)
+
+    # The bulk inserts bypass the ORM events, so build the project members and task counters in one pass
+    refresh_project_members(range(1, projects + 1))
+    refresh_task_counts(range(1, projects + 1))
+
+    # Postgres sequences don't advance for explicit ids, so move them past the seeded rows
+    if db.engine.dialect.name == "postgresql":
+        for table in ("users", "projects", "tasks", "comments"):
+            db.session.execute(db.text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+
+    db.session.commit()
+
+    return {"users": users, "projects": projects, "tasks": len(task_rows), "comments": len(comment_rows)}
+
+
+def add_arguments(parser):
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=100, help="tasks per project")
+    parser.add_argument("--comments", type=int, default=3, help="comments per task")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    from main import create_app
+    from models import db
+
+    with create_app().app_context():
+        print(seed(db, args.users, args.projects, args.tasks, args.comments, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Measure how long a fresh process takes to import the app, build it and serve its first request.
+
+Each run is a new interpreter (what a gunicorn worker without --preload pays on boot). Reports the
+median import, app creation and first-request times and the SQL statements issued before the first
+request, as JSON:
+
+    python -m benchmarks.startup --output after.json
+    python -m benchmarks.startup --ref HEAD~1 --output before.json
+    python -m benchmarks.startup --compare before.json
+
+--ref measures another commit, checked out in a temporary git worktree.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.run import git_commit
+
+# Runs in the child process, from the checkout being measured; prints one JSON line
+CHILD = r"""
+import json, sys, time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+# Older commits build the app at import time
+app = getattr(main, "app", None) or main.create_app()
+created = time.perf_counter()
+startup_statements = len(statements)
+
+response = app.test_client().get("/login")
+served = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "total_ms": (served - started) * 1000,
+    "startup_statements": startup_statements,
+    "status": response.status_code,
+}))
+"""
+
+KEYS = ("import_ms", "create_app_ms", "first_request_ms", "total_ms")
+
+
+def measure(directory, runs):
+    database = tempfile.mkdtemp()
+    env = dict(os.environ, SECRET_KEY="benchmark", DB_URI=f"sqlite:///{database}/startup.db")
+
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=directory, env=env, capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    result = {key: statistics.median(sample[key] for sample in samples) for key in KEYS}
+    result["startup_statements"] = max(sample["startup_statements"] for sample in samples)
+    result["status"] = samples[-1]["status"]
+    return result
+
+
+def compare(before, after):
+    print(f"{'':<22}{'before':>10}{'after':>10}")
+    for key in KEYS + ("startup_statements",):
+        print(f"{key:<22}{before['results'][key]:>10.1f}{after['results'][key]:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ref", help="git commit to measure instead of the working tree")
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes to start")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    commit = git_commit()
+
+    if args.ref:
+        worktree = os.path.join(tempfile.mkdtemp(), "checkout")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.ref], cwd=root, capture_output=True, check=True)
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", args.ref], cwd=root, capture_output=True, text=True, check=True
+            ).stdout.strip()
+            # Warm the bytecode cache once so both sides are measured the same way
+            measure(worktree, 1)
+            results = measure(worktree, args.runs)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=root, capture_output=True)
+    else:
+        measure(root, 1)
+        results = measure(root, args.runs)
+
+    results = {
+        "meta": {"commit": commit, "python": platform.python_version(), "runs": args.runs},
+        "results": results,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+from datetime import date
+
+from sqlalchemy import select, insert, update, delete, union_all, literal, cast, Integer
+
+from models import db, User, Project, Task, Comment
+from membership import refresh_project_members
+from counters import refresh_task_counts
+from versions import bump_versions
+from archive import utcnow
+
+OPERATIONS = ("create", "complete", "reassign", "delete")
+
+
+class OperationError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _integer(operation, key):
+    value = operation.get(key)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise OperationError(400, f"{key} must be an integer")
+    return value
+
+
+def _parse(operation):
+
+    # Check the shape of one operation (without touching the database)
+    if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+        raise OperationError(400, f"op must be one of {', '.join(OPERATIONS)}")
+
+    op = operation["op"]
+
+    if op == "create":
+        text = operation.get("task")
+        if not isinstance(text, str) or not text.strip():
+            raise OperationError(400, "task is required")
+        if len(text) > Task.task_text.type.length:
+            raise OperationError(400, f"task must be at most {Task.task_text.type.length} characters")
+        try:
+            due_date = date.fromisoformat(operation.get("due_date"))
+        except (TypeError, ValueError):
+            raise OperationError(400, "due_date must be a YYYY-MM-DD date")
+        return {"op": op, "project_id": _integer(operation, "project_id"), "task_text": text, "due_date": due_date, "assignee_id": _integer(operation, "assignee_id")}
+
+    parsed = {"op": op, "task_id": _integer(operation, "task_id")}
+
+    if op == "complete":
+        is_complete = operation.get("is_complete", True)
+        if not isinstance(is_complete, bool):
+            raise OperationError(400, "is_complete must be true or false")
+        parsed["is_complete"] = is_complete
+    elif op == "reassign":
+        parsed["assignee_id"] = _integer(operation, "assignee_id")
+
+    return parsed
+
+
+def _load_refs(task_ids, project_ids, user_ids):
+
+    # Everything the permission checks need, in one query: the tasks' owners, the projects' creators
+    # and which of the assignees exist
+    empty = literal(None, Integer)
+    rows = db.session.execute(
+        union_all(
+            select(literal("task"), Task.id, Task.project_id, Task.creator_id, Task.assignee_id).where(Task.id.in_(task_ids)),
+            # The last column of a project row is its pending_delete flag
+            select(literal("project"), Project.id, Project.id, Project.creator_id, cast(Project.pending_delete, Integer)).where(Project.id.in_(project_ids)),
+            select(literal("user"), User.id, empty, empty, empty).where(User.id.in_(user_ids)),
+        )
+    ).all()
+
+    refs = {"task": {}, "project": {}, "user": {}}
+    for kind, id, project_id, creator_id, assignee_id in rows:
+        refs[kind][id] = (project_id, creator_id, assignee_id)
+
+    return refs
+
+
+def _authorize(parsed, refs, user, guest):
+
+    # The same rules as the form routes: creators create, reassign and delete (creator_only),
+    # assignees and creators mark tasks (mark_task), and the guest can only assign tasks to itself
+    if "assignee_id" in parsed:
+        if parsed["assignee_id"] not in refs["user"]:
+            raise OperationError(404, "assignee not found")
+        if guest and parsed["assignee_id"] != user.id:
+            raise OperationError(403, "the guest can only assign tasks to itself")
+
+    if parsed["op"] == "create":
+        project = refs["project"].get(parsed["project_id"])
+        # Projects being deleted in the background are already gone, as on the form routes
+        if project is None or project[2]:
+            raise OperationError(404, "project not found")
+        if project[1] != user.id:
+            raise OperationError(403, "only the project creator can add tasks")
+        return
+
+    task = refs["task"].get(parsed["task_id"])
+    if task is None:
+        raise OperationError(404, "task not found")
+
+    project_id, creator_id, assignee_id = task
+    parsed["project_id"] = project_id
+
+    if parsed["op"] == "complete":
+        if user.id not in (creator_id, assignee_id):
+            raise OperationError(403, "only the task creator or assignee can mark the task")
+    elif user.id != creator_id:
+        raise OperationError(403, "only the task creator can change the task")
+
+
+def apply_task_operations(operations, user, guest=False):
+    """Validate, authorize and apply a batch of task operations in one transaction.
+
+    Returns one result per operation, in order. Invalid or forbidden operations are reported and skipped;
+    the rest are applied with one set-based statement per kind of change.
+    """
+    results = [None] * len(operations)
+    parsed = {}
+
+    for index, operation in enumerate(operations):
+        try:
+            parsed[index] = _parse(operation)
+        except OperationError as error:
+            results[index] = {"status": error.status, "error": error.message}
+
+    # A task can only be changed once per batch, so the order of the statements doesn't matter
+    seen = {}
+    for index, item in list(parsed.items()):
+        if "task_id" in item:
+            if item["task_id"] in seen:
+                results[index] = {"status": 409, "error": f"task already changed by operation {seen[item['task_id']]}"}
+                del parsed[index]
+            else:
+                seen[item["task_id"]] = index
+
+    refs = _load_refs(
+        {item["task_id"] for item in parsed.values() if "task_id" in item},
+        {item["project_id"] for item in parsed.values() if item["op"] == "create"},
+        {item["assignee_id"] for item in parsed.values() if "assignee_id" in item},
+    )
+
+    for index, item in list(parsed.items()):
+        try:
+            _authorize(item, refs, user, guest)
+        except OperationError as error:
+            results[index] = {"status": error.status, "error": error.message}
+            del parsed[index]
+
+    by_op = {op: [(index, item) for index, item in parsed.items() if item["op"] == op] for op in OPERATIONS}
+
+    if by_op["create"]:
+        rows = [
+            {"task_text": item["task_text"], "due_date": item["due_date"], "is_complete": False, "creator_id": user.id, "assignee_id": item["assignee_id"], "project_id": item["project_id"]}
+            for _, item in by_op["create"]
+        ]
+        # One multi-row INSERT, returning the new ids in the same order as the rows
+        new_ids = db.session.scalars(insert(Task).returning(Task.id, sort_by_parameter_order=True), rows).all()
+        for (index, item), task_id in zip(by_op["create"], new_ids):
+            item["task_id"] = task_id
+            results[index] = {"status": 201, "task_id": task_id}
+
+    for is_complete in (True, False):
+        task_ids = [item["task_id"] for _, item in by_op["complete"] if item["is_complete"] == is_complete]
+        if task_ids:
+            db.session.execute(
+                # Only tasks that change state, so completing a task again keeps its completion time
+                update(Task).where(Task.id.in_(task_ids), Task.is_complete != is_complete).values(is_complete=is_complete, completed_at=utcnow() if is_complete else None),
+                execution_options={"synchronize_session": False},
+            )
+
+    if by_op["reassign"]:
+        # Bulk UPDATE by primary key (one executemany)
+        db.session.execute(update(Task), [{"id": item["task_id"], "assignee_id": item["assignee_id"]} for _, item in by_op["reassign"]])
+
+    if by_op["delete"]:
+        task_ids = [item["task_id"] for _, item in by_op["delete"]]
+        db.session.execute(delete(Comment).where(Comment.task_id.in_(task_ids)), execution_options={"synchronize_session": False})
+        db.session.execute(delete(Task).where(Task.id.in_(task_ids)), execution_options={"synchronize_session": False})
+
+    for op in ("complete", "reassign", "delete"):
+        for index, item in by_op[op]:
+            results[index] = {"status": 200, "task_id": item["task_id"]}
+
+    # The statements above bypass the ORM events, so update the project members, task counters and page versions here
+    changed_projects = {item["project_id"] for item in parsed.values()}
+    refresh_project_members({item["project_id"] for item in parsed.values() if item["op"] != "complete"})
+    refresh_task_counts(changed_projects)
+    bump_versions(
+        db.session.connection(),
+        changed_projects,
+        [item["task_id"] for item in parsed.values() if item["op"] in ("complete", "reassign")],
+    )
+
+    return results
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire ttl seconds after they were set.
+
+    Safe to share between the threads of one worker. Each worker process has its own copy, so
+    use SharedCache when entries must be invalidated across workers.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, max_bytes=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Optional limit on the total length of the cached str/bytes values
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        size = self._sizeof(value)
+
+        # Don't let one oversized value flush the whole cache
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._size += size
+
+            # Evict the least recently used entries
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= self._sizeof(entry[1])
+
+    def _sizeof(self, value):
+        if self.max_bytes is None or not isinstance(value, (str, bytes)):
+            return 0
+        return len(value)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "bytes": self._size}
+
+
+class SharedCache:
+    """Cache stored in Redis so that every worker sees the same entries (and the same invalidations).
+
+    Values must be JSON serializable. Needs the optional redis package.
+    """
+
+    def __init__(self, url, prefix, ttl=300):
+        import redis
+
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key, default=None):
+        value = self._client.get(f"{self._prefix}:{key}")
+
+        if value is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        self._client.set(f"{self._prefix}:{key}", json.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self._client.delete(f"{self._prefix}:{key}")
+
+    def clear(self):
+        for key in self._client.scan_iter(f"{self._prefix}:*"):
+            self._client.delete(key)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def make_cache(prefix, url=None, maxsize=1024, ttl=300):
+
+    # Use the shared cache when a CACHE_URL is configured, otherwise the local stand-in
+    if url:
+        return SharedCache(url, prefix, ttl=ttl)
+
+    return TTLCache(maxsize=maxsize, ttl=ttl)
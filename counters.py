@@ -0,0 +1,157 @@
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import event, inspect, select, delete, union_all, and_, func, case, true
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Project, Task, ArchivedTask, TaskCount, ProjectMember
+from membership import old_and_new
+
+# Dashboard counters: task_counts holds the number of tasks per (project, assignee, due date, state).
+# Every ORM task write updates it in the same flush, and set-based writers call refresh_task_counts,
+# so the projects page can show progress without loading any tasks.
+
+
+def _counts_query(project_ids):
+
+    # Archived tasks are complete and still count towards their project's progress
+    tasks = union_all(
+        select(Task.project_id, Task.assignee_id, Task.due_date, Task.is_complete).where(Task.project_id.in_(project_ids)),
+        select(ArchivedTask.project_id, ArchivedTask.assignee_id, ArchivedTask.due_date, true()).where(ArchivedTask.project_id.in_(project_ids)),
+    ).subquery()
+
+    return (
+        select(tasks.c.project_id, tasks.c.assignee_id, tasks.c.due_date, tasks.c.is_complete, func.count())
+        .group_by(tasks.c.project_id, tasks.c.assignee_id, tasks.c.due_date, tasks.c.is_complete)
+    )
+
+
+def refresh_task_counts(project_ids, connection=None):
+
+    # Rebuild the counts of the given projects from their tasks (used after set-based task changes)
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+
+    connection = connection or db.session.connection()
+    connection.execute(delete(TaskCount).where(TaskCount.project_id.in_(project_ids)))
+    connection.execute(
+        TaskCount.__table__.insert().from_select(
+            ["project_id", "assignee_id", "due_date", "is_complete", "task_count"], _counts_query(project_ids)
+        )
+    )
+
+
+def _task_key(task):
+    return task.project_id, task.assignee_id, task.due_date, bool(task.is_complete)
+
+
+def _old_and_new_keys(state):
+
+    # The task's counter before and after the flush
+    values = [old_and_new(state, key) for key in ("project_id", "assignee_id", "due_date", "is_complete")]
+    old, new = zip(*values)
+    return old[:3] + (bool(old[3]),), new[:3] + (bool(new[3]),)
+
+
+def _apply_changes(connection, changes, deleted_projects):
+
+    table = TaskCount.__table__
+
+    rows = [
+        {"project_id": project_id, "assignee_id": assignee_id, "due_date": due_date, "is_complete": is_complete, "task_count": count}
+        for (project_id, assignee_id, due_date, is_complete), count in changes.items()
+        if count
+    ]
+
+    if rows:
+        if connection.dialect.name == "postgresql":
+            insert = postgresql.insert(table)
+        else:
+            insert = sqlite.insert(table)
+
+        connection.execute(
+            insert.on_conflict_do_update(
+                index_elements=[table.c.project_id, table.c.assignee_id, table.c.due_date, table.c.is_complete],
+                set_={"task_count": table.c.task_count + insert.excluded.task_count},
+            ),
+            rows,
+        )
+        connection.execute(
+            delete(table).where(
+                and_(table.c.project_id.in_({row["project_id"] for row in rows}), table.c.task_count <= 0)
+            )
+        )
+
+    if deleted_projects:
+        connection.execute(delete(table).where(table.c.project_id.in_(deleted_projects)))
+
+
+@event.listens_for(db.session, "after_flush")
+def record_count_changes(session, flush_context):
+
+    # Move a task between counters whenever its project, assignee, due date or state changes
+    changes = Counter()
+    deleted_projects = set()
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            changes[_task_key(obj)] += 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            old, new = _old_and_new_keys(inspect(obj))
+            if old != new:
+                changes[old] -= 1
+                changes[new] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            changes[_task_key(obj)] -= 1
+        elif isinstance(obj, Project):
+            deleted_projects.add(obj.id)
+
+    _apply_changes(session.connection(), changes, deleted_projects)
+
+
+def _sum_where(condition):
+    return func.sum(case((condition, TaskCount.task_count), else_=0))
+
+
+def user_projects_query(user_id, today=None):
+    """One row per project the user can open, with its task counters and the user's own.
+
+    Rows are (Project, total, complete, overdue, assigned, assigned_open, assigned_overdue).
+    """
+    if today is None:
+        today = date.today()
+
+    overdue = and_(TaskCount.is_complete == False, TaskCount.due_date < today)
+    mine = TaskCount.assignee_id == user_id
+
+    counts = (
+        select(
+            TaskCount.project_id,
+            func.sum(TaskCount.task_count).label("total"),
+            _sum_where(TaskCount.is_complete == True).label("complete"),
+            _sum_where(overdue).label("overdue"),
+            _sum_where(mine).label("assigned"),
+            _sum_where(and_(mine, TaskCount.is_complete == False)).label("assigned_open"),
+            _sum_where(and_(mine, overdue)).label("assigned_overdue"),
+        )
+        .join(ProjectMember, and_(ProjectMember.project_id == TaskCount.project_id, ProjectMember.user_id == user_id))
+        .group_by(TaskCount.project_id)
+        .subquery()
+    )
+
+    return (
+        select(
+            Project,
+            *(func.coalesce(column, 0).label(column.name) for column in counts.c if column.name != "project_id"),
+        )
+        .join(ProjectMember, and_(ProjectMember.project_id == Project.id, ProjectMember.user_id == user_id))
+        .outerjoin(counts, counts.c.project_id == Project.id)
+        .options(joinedload(Project.creator))
+        .order_by(Project.id)
+    )
@@ -0,0 +1,122 @@
+"""Delete projects and tasks together with everything that belongs to them.
+
+Comments, tasks (live and archived) and the project are removed with set-based DELETEs, children first, so nothing
+is loaded into Python and nothing is left orphaned even where foreign keys aren't enforced (SQLite; on
+Postgres the ON DELETE CASCADE constraints back this up).
+
+Projects with more than DELETE_IN_BACKGROUND_AFTER tasks are hidden at once and then deleted
+DELETE_CHUNK_SIZE tasks per transaction by a background thread, so the request returns immediately and
+no single transaction holds its locks for long. If the process stops half way the project stays hidden
+until the deletion is finished with:
+
+    flask --app main resume-deletes
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from sqlalchemy import select, update, delete, func
+
+from models import db, Project, Task, Comment, ArchivedTask, ArchivedComment, ProjectMember, TaskCount
+
+_executor = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _pid
+
+    with _lock:
+        # One deleter thread per process (started lazily, and again in each forked worker)
+        if _executor is None or _pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="project-deleter")
+            _pid = os.getpid()
+        return _executor
+
+
+def delete_task_comments(task_ids):
+    db.session.execute(delete(Comment).where(Comment.task_id.in_(task_ids)), execution_options={"synchronize_session": False})
+
+
+def _hide_project(project_id):
+
+    # Members and counters go first: that is what grants access to the project and lists it
+    db.session.execute(delete(ProjectMember).where(ProjectMember.project_id == project_id))
+    db.session.execute(delete(TaskCount).where(TaskCount.project_id == project_id))
+    db.session.execute(update(Project).where(Project.id == project_id).values(pending_delete=True))
+
+
+def _delete_tasks(task_ids, task_model=Task, comment_model=Comment):
+    db.session.execute(delete(comment_model).where(comment_model.task_id.in_(task_ids)), execution_options={"synchronize_session": False})
+    db.session.execute(delete(task_model).where(task_model.id.in_(task_ids)), execution_options={"synchronize_session": False})
+
+
+def delete_project(project_id):
+    """Delete a project, its tasks and their comments.
+
+    Returns True if the project is gone, or False if it is too large and is being deleted in the background.
+    The caller commits.
+    """
+    task_count = sum(
+        db.session.scalar(select(func.count()).select_from(task_model).where(task_model.project_id == project_id))
+        for task_model in (Task, ArchivedTask)
+    )
+
+    _hide_project(project_id)
+
+    if task_count > current_app.config["DELETE_IN_BACKGROUND_AFTER"]:
+        # Commit the hidden state before the thread starts so it sees it (and so does everyone else)
+        db.session.commit()
+        _get_executor().submit(_delete_in_background, current_app._get_current_object(), project_id)
+        return False
+
+    for task_model, comment_model in ((Task, Comment), (ArchivedTask, ArchivedComment)):
+        _delete_tasks(select(task_model.id).where(task_model.project_id == project_id).scalar_subquery(), task_model, comment_model)
+    db.session.execute(delete(Project).where(Project.id == project_id), execution_options={"synchronize_session": False})
+    return True
+
+
+def finish_delete(project_id, chunk_size=None):
+
+    # Delete a hidden project chunk by chunk, committing after each chunk
+    if chunk_size is None:
+        chunk_size = current_app.config["DELETE_CHUNK_SIZE"]
+
+    for task_model, comment_model in ((Task, Comment), (ArchivedTask, ArchivedComment)):
+        while True:
+            task_ids = db.session.scalars(
+                select(task_model.id).where(task_model.project_id == project_id).order_by(task_model.id).limit(chunk_size)
+            ).all()
+            if not task_ids:
+                break
+            _delete_tasks(task_ids, task_model, comment_model)
+            db.session.commit()
+
+    db.session.execute(delete(Project).where(Project.id == project_id), execution_options={"synchronize_session": False})
+    db.session.commit()
+
+
+def _delete_in_background(app, project_id):
+    with app.app_context():
+        try:
+            finish_delete(project_id)
+        except Exception:
+            # The project stays hidden; resume-deletes finishes it
+            app.logger.exception("Could not delete project %s", project_id)
+            db.session.rollback()
+
+
+def init_app(app):
+
+    @app.cli.command("resume-deletes")
+    @click.option("--chunk-size", type=int, help="Tasks deleted per transaction (default: DELETE_CHUNK_SIZE).")
+    def resume_deletes(chunk_size):
+        """Finish deleting projects whose background deletion was interrupted."""
+        project_ids = db.session.scalars(select(Project.id).where(Project.pending_delete == True).order_by(Project.id)).all()
+
+        for project_id in project_ids:
+            finish_delete(project_id, chunk_size)
+            click.echo(f"deleted project {project_id}")
@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, PasswordField, DateField, SelectField, FormField
-from wtforms.validators import DataRequired, URL
+from wtforms import StringField, SubmitField, PasswordField, DateField, SelectField, FormField, IntegerField
+from wtforms.validators import DataRequired, URL, Optional
+from wtforms.widgets import HiddenInput
 from flask_ckeditor import CKEditorField
 
 class RegisterForm(FlaskForm):
@@ -22,7 +23,9 @@ class CreateProjectForm(FlaskForm):
 class CreateTaskForm(FlaskForm):
     task = StringField("Task", validators=[DataRequired()])
     due_date = DateField("Due Date", format='%Y-%m-%d', validators=[DataRequired()])
-    assignee = SelectField("Assignee", validators=[DataRequired()])
+    # Typeahead over the users (see scripts.js); the chosen user's id goes in the hidden assignee field
+    assignee_email = StringField("Assignee", render_kw={"autocomplete": "off", "list": "assignee-options", "data-user-search": "assignee", "placeholder": "Start typing an email or name"})
+    assignee = IntegerField(widget=HiddenInput(), validators=[Optional()])
     submit = SubmitField("Submit")
 
 class AssigneeEditTaskForm(FlaskForm):
@@ -1,113 +1,185 @@
+import json
 import os
-from dotenv import load_dotenv
-
-import requests
-from datetime import date, datetime
-import pytz
+import time
+import weakref
+from datetime import date
 import hashlib
+from functools import lru_cache
 from urllib.parse import urlencode
 
-from flask import Flask, abort, render_template, redirect, url_for, request
+import click
+from dotenv import load_dotenv
+from flask import Flask, Response, abort, current_app, has_request_context, jsonify, render_template, redirect, url_for, request, session, make_response, stream_with_context, send_file
 from flask_bootstrap import Bootstrap5
 from flask_ckeditor import CKEditor
+from flask_wtf.csrf import generate_csrf, validate_csrf
+from werkzeug.local import LocalProxy
+from wtforms import ValidationError
 
-from flask_login import UserMixin, login_user, LoginManager, current_user, logout_user, login_required
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, String, Text, Boolean, and_, or_
+from flask_login import login_user, LoginManager, current_user, logout_user, login_required
+from sqlalchemy.orm import joinedload, contains_eager, make_transient_to_detached, object_session
+from sqlalchemy import and_, event, func, union
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
 from forms import LoginForm, RegisterForm, CreateProjectForm, CreateTaskForm, CommentForm, AssigneeEditTaskForm
+from models import db, User, Project, Task, Comment, ArchivedTask, ArchivedComment
+from pagination import keyset_page, url_for_page, encode_cursor
+from membership import is_project_member
+from counters import user_projects_query
+from bulk import apply_task_operations
+import versions
+from cache import make_cache, TTLCache
+import metrics
+import avatars
+from passwords import PasswordHasher
+import transfer
+import deletion
+import archive
+import assets
+import reminders
+import routing
+from routing import reads_from_replica
+import search as full_text_search
+
+# Extensions are bound to each app in create_app
+ckeditor = CKEditor()
+bootstrap = Bootstrap5()
+login_manager = LoginManager()
+password_hasher = PasswordHasher()
+
+# Per-app caches, created in create_app
+user_cache = LocalProxy(lambda: current_app.extensions["user_cache"])
+page_cache = LocalProxy(lambda: current_app.extensions["page_cache"])
+avatar_cache = LocalProxy(lambda: current_app.extensions["avatar_cache"])
+metrics.registry.add_collector(metrics.cache_collector({"user": user_cache, "page": page_cache}))
+
+# Connections opened before a fork (e.g. by code run in a --preload master) must not be shared with the
+# workers, so forked children drop the pooled connections of every app's engines. One hook for the process,
+# over a weak set so apps that are thrown away (tests, benchmarks) don't keep their engines alive
+app_engines = weakref.WeakSet()
+
+def dispose_engines_after_fork():
+    for engine in list(app_engines):
+        engine.dispose(close=False)
 
-load_dotenv()
+os.register_at_fork(after_in_child=dispose_engines_after_fork)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
-ckeditor = CKEditor(app)
-Bootstrap5(app)
+# The views below are added to every app made by create_app, with their function names as endpoints
+routes = []
 
-def gravatar_url(email, size=100, default='retro'):
+def route(rule, **options):
+    def decorator(view):
+        routes.append((rule, view, options))
+        return view
+    return decorator
 
-    # Encode the email to lowercase and then to bytes
-    email_encoded = email.lower().encode('utf-8')
+def gravatar_url(user, size=100, default='retro'):
 
-    # Generate the SHA256 hash of the email
-    email_hash = hashlib.sha256(email_encoded).hexdigest()
+    # Use the hash stored on the user (templates pass users; an email string also works)
+    email_hash = getattr(user, "avatar_hash", None) or avatars.email_hash(getattr(user, "email", user))
+
+    # The same few users appear on every row of a page, so each app builds each URL once (the script
+    # root is in the key since the proxy URLs include it)
+    script_root = request.script_root if has_request_context() else ""
+    return current_app.extensions["avatar_urls"](email_hash, size, default, script_root)
+
+def avatar_url(email_hash, size, default, script_root=""):
+
+    # Serve the images through the local avatar cache if it's enabled
+    if current_app.config["AVATAR_PROXY"]:
+        return url_for("get_avatar", email_hash=email_hash, s=size, d=default)
 
     # Construct the URL with encoded query parameters
     query_params = urlencode({'d': default, 's': str(size)})
     return f"https://www.gravatar.com/avatar/{email_hash}?{query_params}"
 
 
+# Load a project with its creator and one page each of open and completed tasks (with their assignees and creators)
+# in a fixed number of queries
+def load_project_view(project_id, open_cursor=None, completed_cursor=None):
 
+    result = db.session.execute(db.select(Project).where(Project.id == project_id).options(joinedload(Project.creator)))
+    project = result.scalar()
 
-# Set up the login manager
-login_manager = LoginManager()
-login_manager.init_app(app)
-
-# Create Database
-class Base(DeclarativeBase):
-    pass
-
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DB_URI",'sqlite:///todos.db')
-db = SQLAlchemy(model_class=Base)
-db.init_app(app)
-
-# User Table
-class User(UserMixin,db.Model):
-    __tablename__ = "users"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    email: Mapped[str] = mapped_column(String(100), unique=True)
-    name: Mapped[str] = mapped_column(String(100))
-    password: Mapped[str] = mapped_column(String(100))
-    projects = db.relationship("Project", back_populates="creator")
-    # tasks = db.relationship("Task", back_populates="creator")
-    # assigned_tasks = db.relationship("Task", back_populates="assignee")
-    comments = db.relationship("Comment", back_populates="comment_author")
-
-# Project Table
-class Project(db.Model):
-    __tablename__ = "projects"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    title: Mapped[str] = mapped_column(String(250), nullable=False)
-    description: Mapped[str] = mapped_column(Text)
-    date: Mapped[str] = mapped_column(String(250), nullable=False)
-    creator_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
-    creator = db.relationship("User", back_populates="projects")
-    tasks = db.relationship("Task", back_populates="project")
-
-# Task Table
-class Task(db.Model):
-    __tablename__ = "tasks"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    task_text: Mapped[str] = mapped_column(String(100), nullable=False)
-    due_date: Mapped[str] = mapped_column(String(250), nullable=False)
-    is_complete: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
-    creator_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
-    creator = db.relationship("User", foreign_keys=[creator_id])
-    assignee_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
-    assignee = db.relationship("User", foreign_keys=[assignee_id])
-    project_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("projects.id"))
-    project = db.relationship("Project", back_populates="tasks")
-    comments = db.relationship("Comment", back_populates="task")
-
-# Comment Table
-class Comment(db.Model):
-    __tablename__ = "comments"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    comment_text: Mapped[str] = mapped_column(String(100), nullable=False)
-    comment_author_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
-    comment_author = db.relationship("User", back_populates="comments")
-    task_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("tasks.id"))
-    task = db.relationship("Task", back_populates="comments")
-
-with app.app_context():
-    db.create_all()
+    # Projects being deleted in the background are already gone as far as the pages are concerned
+    if project is None or project.pending_delete:
+        abort(404)
+
+    # Get one page of the project's open tasks and one page of its completed tasks
+    tasks_query = db.select(Task).where(Task.project_id == project_id).options(joinedload(Task.assignee), joinedload(Task.creator))
+
+    open_tasks = keyset_page(tasks_query.where(Task.is_complete == False), [Task.id], open_cursor)
+    completed_tasks = keyset_page(tasks_query.where(Task.is_complete == True), [Task.id], completed_cursor)
 
+    return project, open_tasks, completed_tasks
+
+# Load one page of a task's comments, newest first, with their authors in one query
+def load_task_comments(task_id, cursor=None):
+
+    return keyset_page(
+        db.select(Comment).where(Comment.task_id == task_id).options(joinedload(Comment.comment_author)),
+        [Comment.id],
+        cursor,
+        page_size=current_app.config["COMMENT_PAGE_SIZE"],
+        descending=True
+    )
+
+# Users loaded for each request are cached (without their password hash) so most requests skip the users query
+USER_CACHE_COLUMNS = [column.key for column in User.__table__.columns if column.key != "password"]
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.get_or_404(User, user_id)
+
+    values = user_cache.get(int(user_id))
+
+    if values is None:
+        user = db.get_or_404(User, user_id)
+        user_cache.set(user.id, {key: getattr(user, key) for key in USER_CACHE_COLUMNS})
+        return user
+
+    # Rebuild the user from the cached columns and add it to this request's session without a query
+    # (the password is loaded from the database if something reads it)
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+# Drop cached users when their record changes
+@event.listens_for(User, "after_update")
+def invalidate_updated_user(mapper, connection, target):
+
+    # Adding a project or comment also marks the user as dirty, so only drop it when a column changed
+    if object_session(target).is_modified(target, include_collections=False):
+        user_cache.delete(target.id)
+
+@event.listens_for(User, "after_delete")
+def invalidate_deleted_user(mapper, connection, target):
+    user_cache.delete(target.id)
+
+def page_etag(*parts):
+
+    # A page depends on who is viewing it, which page it is, the versions of the records on it and the query string
+    key = ":".join(str(part) for part in (current_user.id, request.endpoint, *parts, request.query_string.decode()))
+
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+def cached_page(etag, render):
+
+    if request.if_none_match.contains(etag):
+        # The browser already has this version of the page
+        response = Response(status=304)
+    else:
+        html = page_cache.get(etag)
+
+        if html is None:
+            html = render()
+            page_cache.set(etag, html)
+
+        response = make_response(html)
+
+    response.set_etag(etag)
+    # Always revalidate, since the page must change as soon as the data does
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    return response
 
 # Decorator function for admin only
 def admin_only(f):
@@ -125,9 +197,12 @@ def creator_only(f):
 
         index = int(request.path.split("/")[2])
 
-        if request.endpoint == "add_new_task" or request.endpoint == "edit_project" or request.endpoint == "delete_project":
+        if request.endpoint == "add_new_task" or request.endpoint == "edit_project" or request.endpoint == "delete_project" or request.endpoint == "project_analytics":
             project = db.get_or_404(Project, index)
 
+            if project.pending_delete:
+                return abort(404)
+
             if current_user.id != project.creator_id:
                 return abort(403)
 
@@ -166,46 +241,48 @@ def collaborators_only(f):
 
         index = int(request.path.split("/")[2])
 
-        if request.endpoint == "show_project":
-            project = db.get_or_404(Project, index)
-            task_assignee_ids = [task.assignee_id for task in project.tasks]
-
-            if current_user.id != project.creator_id:
-                if current_user.id not in task_assignee_ids:
-                    return abort(403)
-                else:
-                    return f(*args, **kwargs)
+        if request.endpoint == "show_project" or request.endpoint == "archived_tasks":
+            # Project creator and the creators/assignees of its tasks (one lookup in project_members)
+            if not is_project_member(index, current_user.id):
+                # Keep returning 404 rather than 403 for projects that don't exist (or are being deleted)
+                if db.get_or_404(Project, index).pending_delete:
+                    return abort(404)
+                return abort(403)
 
             return f(*args, **kwargs)
 
-        elif request.endpoint == "show_task":
+        elif request.endpoint == "show_task" or request.endpoint == "add_comment" or request.endpoint == "task_comments":
             # Get the task from the index
             task = db.get_or_404(Task, index)
 
-            # Get the project from the task
-            required_project = task.project
+            # Any member of the task's project can see the task
+            if not is_project_member(task.project_id, current_user.id):
+                return abort(403)
 
-            # Get all task creator_ids and assignee_ids from the project
-            task_assignee_ids = [task.assignee_id for task in required_project.tasks]
-            task_creator_ids = [task.creator_id for task in required_project.tasks]
+            return f(*args, **kwargs)
+
+        elif request.endpoint == "show_archived_task":
+            task = db.get_or_404(ArchivedTask, index)
 
-            if current_user.id not in (task_assignee_ids or task_creator_ids):
+            # Archived tasks are visible to the same people as the rest of their project
+            if not is_project_member(task.project_id, current_user.id):
                 return abort(403)
 
             return f(*args, **kwargs)
 
-        elif request.endpoint == "mark_task":
+        elif request.endpoint == "mark_task" or request.endpoint == "toggle_task":
             # Get the task from the index
             task = db.get_or_404(Task, index)
 
-            if current_user.id != (task.assignee_id or task.creator_id):
+            # Only the task's assignee or creator can mark it
+            if current_user.id not in (task.assignee_id, task.creator_id):
                 return abort(403)
 
             return f(*args, **kwargs)
 
     return decorated_function
 
-@app.route("/register", methods=['GET','POST'])
+@route("/register", methods=['GET','POST'])
 @login_required
 @admin_only
 def register():
@@ -221,11 +298,7 @@ def register():
         if user:
             return redirect(url_for('login'))
 
-        hash_and_salted_password = generate_password_hash(
-            form.password.data,
-            method="pbkdf2:sha256",
-            salt_length=8
-        )
+        hash_and_salted_password = password_hasher.hash(form.password.data)
 
         new_user = User(
             email = form.email.data,
@@ -239,7 +312,7 @@ def register():
 
     return render_template("register.html", form=form, gravatar_url=gravatar_url, current_user=current_user)
 
-@app.route("/login", methods=['GET','POST'])
+@route("/login", methods=['GET','POST'])
 def login():
     form=LoginForm()
 
@@ -252,15 +325,20 @@ def login():
         if not user:
             return redirect(url_for('login'))
         # Incorrect password
-        elif not check_password_hash(user.password, form.password.data):
+        elif not password_hasher.verify(user.password, form.password.data):
             return redirect(url_for('login'))
         else:
+            # Upgrade hashes made with an older method, cost or salt length while we have the password
+            if password_hasher.needs_rehash(user.password):
+                user.password = password_hasher.hash(form.password.data)
+                db.session.commit()
+
             login_user(user)
             return redirect(url_for('home'))
 
     return render_template("login.html", form=form, gravatar_url=gravatar_url, current_user=current_user)
 
-@app.route("/login-guest", methods=['GET','POST'])
+@route("/login-guest", methods=['GET','POST'])
 def login_guest():
 
     result = db.session.execute(db.select(User).where(User.email == "guest@email.com"))
@@ -269,49 +347,120 @@ def login_guest():
     login_user(user)
     return redirect(url_for('home'))
 
-@app.route("/logout")
+@route("/logout")
 def logout():
     logout_user()
     return redirect(url_for('home'))
 
 # Show all the registered users (Only admin has access)
-@app.route("/users")
+@route("/users")
+@reads_from_replica
 @login_required
 @admin_only
 def get_all_users():
 
-    results = db.session.execute(db.select(User))
-    all_users = results.scalars().all()
+    users = keyset_page(db.select(User), [User.id], request.args.get("after"))
+
+    return render_template("users.html", gravatar_url=gravatar_url, url_for_page=url_for_page, users = users, current_user=current_user)
+
+# Show request, SQL and template metrics in Prometheus text format (Only admin has access)
+@route("/metrics")
+@login_required
+@admin_only
+def get_metrics():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+# Download projects, tasks and/or comments as CSV or JSONL (Only admin has access)
+@route("/export/<kind>")
+@reads_from_replica
+@login_required
+@admin_only
+def export_data(kind):
+
+    file_format = request.args.get("format", "jsonl")
+    if kind not in transfer.KINDS or file_format not in transfer.FORMATS:
+        return abort(404)
 
-    return render_template("users.html", gravatar_url=gravatar_url, users = all_users, current_user=current_user)
+    try:
+        lines = transfer.export_lines(kind, file_format, request.args.getlist("project_id", type=int))
+    except ValueError:
+        return abort(400)
+
+    # Stream the rows as they come off the cursor instead of building the whole file in memory
+    response = Response(stream_with_context(lines), mimetype=transfer.FORMATS[file_format])
+    response.headers["Content-Disposition"] = f"attachment; filename={kind}.{file_format}"
+
+    return response
+
+# Search the tasks, projects and comments of the current user's projects
+@route("/search")
+@reads_from_replica
+@login_required
+def search():
+
+    text = request.args.get("q", "").strip()
+
+    results = None
+    if text:
+        results = full_text_search.search(text, current_user.id, request.args.get("after"))
+
+    return render_template("search.html", gravatar_url=gravatar_url, url_for_page=url_for_page, text=text, results=results)
+
+# Avatar images from the local disk cache, fetched from upstream on a miss
+@route("/avatar/<email_hash>")
+def get_avatar(email_hash):
+
+    if not current_app.config["AVATAR_PROXY"] or not avatars.HASH_PATTERN.match(email_hash):
+        return abort(404)
+
+    size = max(1, min(request.args.get("s", 100, type=int), 512))
+    default = request.args.get("d", "retro")
+    # Only Gravatar's own defaults, so the proxy can't be pointed at other URLs
+    if default not in avatars.DEFAULTS:
+        return abort(404)
+    key = f"{email_hash}-{size}-{default}"
+
+    cached = avatar_cache.get(key)
+
+    if cached is None:
+        try:
+            content_type, data = avatars.load_fetcher(current_app.config["AVATAR_FETCHER"])(email_hash, size, default)
+        except Exception:
+            current_app.logger.exception("Could not fetch avatar %s", email_hash)
+            return abort(502)
+
+        cached = avatar_cache.put(key, content_type, data)
+        if cached is None:
+            # Not an image type we store, or too big for the cache
+            return abort(502)
+
+    path, content_type = cached
+    # The cache touches files when they are read, so the ETag comes from the key rather than the file's mtime
+    response = send_file(path, mimetype=content_type, max_age=current_app.config["AVATAR_MAX_AGE"], conditional=True, etag=key)
+    response.cache_control.public = True
+    response.headers["X-Content-Type-Options"] = "nosniff"
+
+    return response
 
 # Get the home page
-@app.route("/")
+@route("/")
 def home():
 
     return render_template("index.html", gravatar_url=gravatar_url, current_user=current_user)
 
 # Get the current user's projects page
-@app.route("/current-user-projects")
+@route("/current-user-projects")
+@reads_from_replica
 @login_required
 def get_current_user_projects():
 
-    # Get all current user's assigned tasks
-    results = db.session.execute(db.select(Task).where(Task.assignee_id == current_user.id))
-    tasks = results.scalars().all()
-
-    # Get all the project_id of projects containing current user's assigned tasks
-    project_ids = [task.project_id for task in tasks]
-    # print(project_ids)
-
-    # Get all projects created by current user or projects that have tasks assigned to current user from the database
-    results = db.session.execute(db.select(Project).filter(or_(Project.creator_id == current_user.id, Project.id.in_(project_ids))))
-    all_projects = results.scalars().all()
+    # The projects the user created or has tasks in, with their progress from the task counters, in one query
+    projects = db.session.execute(user_projects_query(current_user.id)).all()
 
-    return render_template("user-projects.html", gravatar_url=gravatar_url, current_user=current_user, projects=all_projects)
+    return render_template("user-projects.html", gravatar_url=gravatar_url, current_user=current_user, projects=projects)
 
 # Add new projects
-@app.route("/new-project", methods=['GET','POST'])
+@route("/new-project", methods=['GET','POST'])
 @login_required
 def add_new_project():
 
@@ -323,7 +472,7 @@ def add_new_project():
         new_project = Project(
             title = form.title.data,
             description = form.description.data,
-            date = date.today().strftime("%B %d, %Y"),
+            date = date.today(),
             creator = current_user
         )
         db.session.add(new_project)
@@ -334,17 +483,50 @@ def add_new_project():
     return render_template("make-project.html", gravatar_url=gravatar_url, form=form)
 
 # Show project details
-@app.route("/show-project/<int:project_id>")
+@route("/show-project/<int:project_id>")
+@reads_from_replica
 @login_required
 @collaborators_only
 def show_project(project_id):
 
-    project = db.get_or_404(Project, project_id)
+    # Check the project's version first so unchanged pages are answered without loading the tasks
+    version = db.session.execute(db.select(Project.version).where(Project.id == project_id)).scalar()
+
+    if version is None:
+        return abort(404)
+
+    def render():
+        project, open_tasks, completed_tasks = load_project_view(
+            project_id,
+            open_cursor=request.args.get("open_after"),
+            completed_cursor=request.args.get("completed_after")
+        )
+
+        return render_template("project.html", gravatar_url=gravatar_url, url_for_page=url_for_page, project=project, open_tasks=open_tasks, completed_tasks=completed_tasks)
+
+    return cached_page(page_etag(project_id, version), render)
+
+# Burndown, completion rate and throughput of a project for its charts (JSON)
+@route("/project-analytics/<int:project_id>")
+@reads_from_replica
+@login_required
+@creator_only
+def project_analytics(project_id):
 
-    return render_template("project.html", gravatar_url=gravatar_url, project=project)
+    # NumPy is slow to import, so only load it (with analytics) here
+    import analytics
+
+    version = db.session.execute(db.select(Project.version).where(Project.id == project_id)).scalar()
+
+    # The figures change with the project's tasks and, since overdue depends on it, with the day
+    today = date.today()
+    response = cached_page(page_etag(project_id, version, today), lambda: json.dumps(analytics.project_analytics(project_id, today)))
+    response.mimetype = "application/json"
+
+    return response
 
 # Edit project
-@app.route("/edit-project/<int:project_id>", methods=['GET', 'POST'])
+@route("/edit-project/<int:project_id>", methods=['GET', 'POST'])
 @login_required
 @creator_only
 def edit_project(project_id):
@@ -368,66 +550,61 @@ def edit_project(project_id):
     return render_template("make-project.html", is_edit=True, gravatar_url=gravatar_url, form=form)
 
 # Delete project
-@app.route("/delete-project/<int:project_id>")
+@route("/delete-project/<int:project_id>")
 @login_required
 @creator_only
 def delete_project(project_id):
 
-    # Get project to delete from database
-    project_to_delete = db.get_or_404(Project, project_id)
-
-    # Get all the ids of the tasks in the project to delete
-    tasks = project_to_delete.tasks
-    task_ids = [task.id for task in tasks]
-
-    # Delete the tasks
-    db.session.execute(db.delete(Task).where(Task.id.in_(task_ids)))
-
-    # Delete the project
-    db.session.delete(project_to_delete)
+    # Delete the project with its tasks and their comments (large projects finish in the background)
+    deletion.delete_project(project_id)
     db.session.commit()
 
     return redirect(url_for("get_current_user_projects"))
 
 # Show only current user's assigned tasks
-@app.route("/current-user-tasks")
+@route("/current-user-tasks")
+@reads_from_replica
 @login_required
 def get_current_user_tasks():
 
+    # Keyset columns for each sort order (the task id breaks ties so every task has a unique position)
     if request.args.get("sort_by") == "project":
-        results = db.session.execute(
-            db.select(Task).filter(and_(Task.assignee_id == current_user.id, Task.is_complete == False)).order_by(
-                Task.project_id))
+        sort_columns = [Task.project_id, Task.id]
     elif request.args.get("sort_by") == "creator":
-        results = db.session.execute(
-            db.select(Task).filter(and_(Task.assignee_id == current_user.id, Task.is_complete == False)).order_by(
-                Task.creator_id))
+        sort_columns = [Task.creator_id, Task.id]
     else:
-        results = db.session.execute(
-            db.select(Task).filter(and_(Task.assignee_id == current_user.id, Task.is_complete == False)).order_by(
-                Task.due_date))
-
-    assigned_tasks = results.scalars().all()
+        sort_columns = [Task.due_date, Task.id]
+
+    assigned_tasks = keyset_page(
+        db.select(Task)
+        .join(Task.project)
+        # Leave out the tasks of projects that are being deleted
+        .filter(and_(Task.assignee_id == current_user.id, Task.is_complete == False, Project.pending_delete == False))
+        .options(joinedload(Task.creator), contains_eager(Task.project)),
+        sort_columns,
+        request.args.get("after")
+    )
 
-    return render_template("assigned-tasks.html", gravatar_url=gravatar_url, tasks=assigned_tasks)
+    return render_template("assigned-tasks.html", gravatar_url=gravatar_url, csrf_token=generate_csrf, url_for_page=url_for_page, tasks=assigned_tasks)
 
-@app.route("/order-tasks-by-due-date")
+@route("/order-tasks-by-due-date")
 @login_required
 def order_tasks_by_due_date():
     return redirect(url_for("get_current_user_tasks", sort_by="due_date"))
 
-@app.route("/order-tasks-by-project")
+@route("/order-tasks-by-project")
 @login_required
 def order_tasks_by_project():
     return redirect(url_for("get_current_user_tasks", sort_by="project"))
 
-@app.route("/order-tasks-by-creator")
+@route("/order-tasks-by-creator")
 @login_required
 def order_tasks_by_creator():
     return redirect(url_for("get_current_user_tasks", sort_by="creator"))
 
 # Show task details
-@app.route("/task/<int:task_id>", methods=['GET', 'POST'])
+@route("/task/<int:task_id>", methods=['GET', 'POST'])
+@reads_from_replica
 @login_required
 @collaborators_only
 def show_task(task_id):
@@ -448,10 +625,71 @@ def show_task(task_id):
 
         return redirect(url_for("show_task", task_id=task.id))
 
-    return render_template("task.html", gravatar_url=gravatar_url, project_id=task.project_id, task=task, form=form)
+    if request.method == "POST":
+        # Show the validation errors
+        comments = load_task_comments(task.id, request.args.get("after"))
+        return render_template("task.html", gravatar_url=gravatar_url, csrf_token=generate_csrf, project_id=task.project_id, task=task, comments=comments, form=form)
+
+    project_version = db.session.execute(db.select(Project.version).where(Project.id == task.project_id)).scalar()
+
+    # The page embeds the comment form's CSRF token, so it also depends on the session's token and
+    # is re-rendered twice per token lifetime
+    csrf_time_limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    csrf_epoch = int(time.time() // (csrf_time_limit / 2)) if csrf_time_limit else 0
+
+    def render():
+        comments = load_task_comments(task.id, request.args.get("after"))
+        return render_template("task.html", gravatar_url=gravatar_url, csrf_token=generate_csrf, project_id=task.project_id, task=task, comments=comments, form=form)
+
+    return cached_page(page_etag(task_id, task.version, project_version, session.get("csrf_token"), csrf_epoch), render)
+
+# Archived tasks of a project, newest first (the project page loads them on request)
+@route("/archived-tasks/<int:project_id>")
+@reads_from_replica
+@login_required
+@collaborators_only
+def archived_tasks(project_id):
+
+    project = db.get_or_404(Project, project_id)
+
+    archived = keyset_page(
+        db.select(ArchivedTask).where(ArchivedTask.project_id == project_id).options(joinedload(ArchivedTask.assignee)),
+        [ArchivedTask.id],
+        request.args.get("after"),
+        descending=True
+    )
+
+    if request.accept_mimetypes.best == "application/json":
+        html = "".join(
+            render_template("archived-task-row.html", gravatar_url=gravatar_url, task=task) for task in archived.items
+        )
+        pager = render_template("archived-pager.html", project=project, archived_tasks=archived)
+
+        return jsonify(append={"archived-task-list": html}, replace={"archived-pager": pager})
+
+    return render_template("archived-tasks.html", gravatar_url=gravatar_url, project=project, archived_tasks=archived)
+
+# Show an archived task with its comments (read only)
+@route("/archived-task/<int:task_id>")
+@reads_from_replica
+@login_required
+@collaborators_only
+def show_archived_task(task_id):
+
+    task = db.get_or_404(ArchivedTask, task_id)
+
+    comments = keyset_page(
+        db.select(ArchivedComment).where(ArchivedComment.task_id == task_id).options(joinedload(ArchivedComment.comment_author)),
+        [ArchivedComment.id],
+        request.args.get("after"),
+        page_size=current_app.config["COMMENT_PAGE_SIZE"],
+        descending=True
+    )
+
+    return render_template("archived-task.html", gravatar_url=gravatar_url, task=task, comments=comments)
 
 # Edit comment
-@app.route("/edit-comment", methods=['GET', 'POST'])
+@route("/edit-comment", methods=['GET', 'POST'])
 @login_required
 def edit_comment():
 
@@ -470,10 +708,30 @@ def edit_comment():
 
         return redirect(url_for("show_task", task_id=request.args.get('task_id')))
 
-    return render_template("task.html", is_edit_comment=True, comment_id=int(request.args.get('comment_id')), gravatar_url=gravatar_url, task=task, form=form)
+    # Show the comments from the one being edited onwards
+    comments = load_task_comments(task.id, encode_cursor([comment.id + 1]))
+
+    return render_template("task.html", is_edit_comment=True, comment_id=int(request.args.get('comment_id')), gravatar_url=gravatar_url, csrf_token=generate_csrf, task=task, comments=comments, form=form)
+
+# Older comments for the "Load Older Comments" button on the task page
+@route("/task-comments/<int:task_id>")
+@reads_from_replica
+@login_required
+@collaborators_only
+def task_comments(task_id):
+
+    task = db.get_or_404(Task, task_id)
+    comments = load_task_comments(task.id, request.args.get("after"))
+
+    html = "".join(
+        render_template("comment.html", gravatar_url=gravatar_url, task=task, comment=comment) for comment in comments.items
+    )
+    pager = render_template("comment-pager.html", task=task, comments=comments)
+
+    return jsonify(append={"comment-list": html}, replace={"comment-pager": pager})
 
 # Delete comment
-@app.route("/delete-comment")
+@route("/delete-comment")
 @login_required
 def delete_comment():
 
@@ -485,7 +743,7 @@ def delete_comment():
 
 
 # Mark task (Change the state of is_complete)
-@app.route("/mark-my-task/<int:task_id>")
+@route("/mark-my-task/<int:task_id>")
 @login_required
 @assignee_only
 def mark_my_task(task_id):
@@ -497,7 +755,7 @@ def mark_my_task(task_id):
     return redirect(url_for("get_current_user_tasks"))
 
 # Mark task (Change the state of is_complete)
-@app.route("/mark-task/<int:task_id>")
+@route("/mark-task/<int:task_id>")
 @login_required
 @collaborators_only
 def mark_task(task_id):
@@ -508,8 +766,152 @@ def mark_task(task_id):
 
     return redirect(url_for("show_project", project_id=request.args.get("project_id")))
 
+# Partial page updates (used by scripts.js; the routes above are the fallback without JavaScript)
+def validate_ajax_csrf():
+
+    # The token comes from the page's csrf-token meta tag or the submitted form
+    if current_app.config.get("WTF_CSRF_ENABLED", True):
+        try:
+            validate_csrf(request.headers.get("X-CSRFToken") or request.form.get("csrf_token"))
+        except ValidationError:
+            abort(400)
+
+def task_fragments(task, view):
+
+    # The parts of the task page or of the assigned tasks list that show this task, keyed by element id
+    if view == "assigned":
+        # Completed tasks (and tasks assigned to someone else) drop out of the assigned tasks list
+        if task.is_complete or task.assignee_id != current_user.id:
+            return {f"assigned-task-{task.id}": ""}
+
+        row = render_template("assigned-task-row.html", gravatar_url=gravatar_url, csrf_token=generate_csrf, task=task)
+        return {f"assigned-task-{task.id}": row}
+
+    fragments = {}
+    for name in ("task-toggle", "task-status", "task-due-date"):
+        fragments[name] = render_template(f"{name}.html", gravatar_url=gravatar_url, csrf_token=generate_csrf, project_id=task.project_id, task=task)
+
+    return fragments
+
+# Mark task and return the changed parts of the page
+@route("/toggle-task/<int:task_id>", methods=['POST'])
+@login_required
+@collaborators_only
+def toggle_task(task_id):
+
+    validate_ajax_csrf()
+
+    task = db.get_or_404(Task, task_id)
+    task.is_complete = not task.is_complete
+    db.session.commit()
+
+    return jsonify(task_id=task.id, is_complete=task.is_complete, replace=task_fragments(task, request.args.get("view")))
+
+# Change the due date by task assignee and return the changed parts of the page
+@route("/update-task-due-date/<int:task_id>", methods=['POST'])
+@login_required
+@assignee_only
+def update_task_due_date(task_id):
+
+    task = db.get_or_404(Task, task_id)
+
+    form = AssigneeEditTaskForm()
+
+    if not form.validate_on_submit():
+        return jsonify(errors=form.errors), 400
+
+    task.due_date = form.due_date.data
+    db.session.commit()
+
+    return jsonify(task_id=task.id, due_date=task.due_date.isoformat(), replace=task_fragments(task, request.args.get("view")))
+
+# Add a comment and return it to be appended to the comment list
+@route("/add-comment/<int:task_id>", methods=['POST'])
+@login_required
+@collaborators_only
+def add_comment(task_id):
+
+    task = db.get_or_404(Task, task_id)
+
+    form = CommentForm()
+
+    if not form.validate_on_submit():
+        return jsonify(errors=form.errors), 400
+
+    new_comment = Comment(
+        comment_author_id = current_user.id,
+        task_id = task.id,
+        comment_text=form.comment_text.data
+    )
+    db.session.add(new_comment)
+    db.session.commit()
+
+    html = render_template("comment.html", gravatar_url=gravatar_url, task=task, comment=new_comment)
+
+    # Comments are listed newest first
+    return jsonify(comment_id=new_comment.id, prepend={"comment-list": html})
+
+# Assignee picker for the task forms: the browser asks search_users for matching users and submits the
+# chosen user's id, so the forms never list the whole user table
+def prepare_assignee_field(form):
+    form.assignee_email.render_kw = {**form.assignee_email.render_kw, "data-search-url": url_for("search_users")}
+
+def chosen_assignee(form):
+
+    # Load only the chosen user (or, without JavaScript, the user with the typed email)
+    email = (form.assignee_email.data or "").strip()
+    user = db.session.get(User, form.assignee.data) if form.assignee.data else None
+
+    # The typed email wins over a stale id (e.g. a prefilled assignee that was changed without JavaScript)
+    if email and (user is None or user.email != email):
+        user = db.session.execute(db.select(User).where(User.email == email)).scalar()
+
+    if user is None:
+        form.assignee_email.errors.append("Choose a user from the list.")
+        return None
+
+    if current_user.email == "guest@email.com" and user.id != current_user.id:
+        # Only allow guest to assign task to guest
+        form.assignee_email.errors.append("Guest can only assign tasks to guest.")
+        return None
+
+    return user
+
+def users_with_prefix(prefix, limit):
+
+    # Users whose email or name starts with prefix (case-insensitive). A range on lower(...) seeks the
+    # ix_users_*_lower indexes on both SQLite and Postgres, where LIKE 'prefix%' might not.
+    prefix = prefix.lower()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    matches = [
+        db.select(User.id).where(func.lower(column) >= prefix, func.lower(column) < upper).order_by(func.lower(column)).limit(limit).subquery()
+        for column in (User.email, User.name)
+    ]
+    ids = union(*(db.select(match.c.id) for match in matches))
+
+    return db.session.execute(db.select(User.id, User.email, User.name).where(User.id.in_(ids)).order_by(User.email).limit(limit)).all()
+
+# Typeahead for the assignee field
+@route("/api/users/search")
+@reads_from_replica
+@login_required
+def search_users():
+
+    text = request.args.get("q", "").strip()
+
+    if current_user.email == "guest@email.com":
+        # Guest can only assign tasks to guest
+        users = [current_user]
+    elif text:
+        users = users_with_prefix(text, current_app.config["USER_SEARCH_LIMIT"])
+    else:
+        users = []
+
+    return jsonify(users=[{"id": user.id, "email": user.email, "name": user.name} for user in users])
+
 # Add new tasks
-@app.route("/new-task/<int:project_id>", methods=['GET','POST'])
+@route("/new-task/<int:project_id>", methods=['GET','POST'])
 @login_required
 @creator_only
 def add_new_task(project_id):
@@ -517,27 +919,16 @@ def add_new_task(project_id):
     # Get the project from the database
     project = db.get_or_404(Project, project_id)
 
-    # Get all the users from the database
-    results = db.session.execute(db.select(User))
-    users = results.scalars().all()
-
-    # Form a list of tuples for SelectField in CreateTaskForm
-    user_emails = [(user.id, user.email) for user in users]
-
     form = CreateTaskForm()
+    prepare_assignee_field(form)
 
-    if current_user.email == "guest@email.com":
-        # Only allow guest to assign task to guest
-        form.assignee.choices = [(current_user.id, current_user.email)]
-    else:
-        # Pass the list of tuples into the form
-        form.assignee.choices = user_emails
+    if current_user.email == "guest@email.com" and not form.is_submitted():
+        # Guest can only assign tasks to guest
+        form.assignee.data = current_user.id
+        form.assignee_email.data = current_user.email
 
     # Add the new task to database
-    if form.validate_on_submit():
-
-        # Get the assignee from the database
-        assigned_user = db.get_or_404(User,form.assignee.data)
+    if form.validate_on_submit() and (assigned_user := chosen_assignee(form)):
 
         new_task = Task(
             task_text=form.task.data,
@@ -554,37 +945,22 @@ def add_new_task(project_id):
     return render_template("make-task.html", gravatar_url=gravatar_url, form=form)
 
 # Edit task by task creator
-@app.route("/edit-task/<int:task_id>", methods=['GET', 'POST'])
+@route("/edit-task/<int:task_id>", methods=['GET', 'POST'])
 @login_required
 @creator_only
 def edit_task(task_id):
 
     task_to_edit = db.get_or_404(Task,task_id)
 
-    # Get all the users from the database
-    results = db.session.execute(db.select(User))
-    users = results.scalars().all()
-
-    # Form a list of tuples for SelectField in CreateTaskForm
-    user_emails = [(user.id, user.email) for user in users]
-
     form = CreateTaskForm(
         task=task_to_edit.task_text,
-        due_date=datetime.strptime(task_to_edit.due_date, "%Y-%m-%d"),
-        assignee=task_to_edit.assignee.id
+        due_date=task_to_edit.due_date,
+        assignee=task_to_edit.assignee.id,
+        assignee_email=task_to_edit.assignee.email
     )
+    prepare_assignee_field(form)
 
-    if current_user.email == "guest@email.com":
-        # Only allow guest to assign task to guest
-        form.assignee.choices = [(current_user.id, current_user.email)]
-    else:
-        # Pass the list of tuples into the form
-        form.assignee.choices = user_emails
-
-    if form.validate_on_submit():
-
-        # Get the assignee from the database
-        assigned_user = db.get_or_404(User, form.assignee.data)
+    if form.validate_on_submit() and (assigned_user := chosen_assignee(form)):
 
         task_to_edit.task_text = form.task.data
         task_to_edit.due_date = form.due_date.data
@@ -597,7 +973,7 @@ def edit_task(task_id):
     return render_template("make-task.html", is_edit=True, gravatar_url=gravatar_url, form=form)
 
 # Edit task due date by task assignee
-@app.route("/edit-task-due-date/<int:task_id>", methods=['GET', 'POST'])
+@route("/edit-task-due-date/<int:task_id>", methods=['GET', 'POST'])
 @login_required
 @assignee_only
 def edit_task_due_date(task_id):
@@ -605,7 +981,7 @@ def edit_task_due_date(task_id):
     task_to_edit = db.get_or_404(Task,task_id)
 
     form = AssigneeEditTaskForm(
-        due_date = datetime.strptime(task_to_edit.due_date, "%Y-%m-%d")
+        due_date = task_to_edit.due_date
     )
 
     if form.validate_on_submit():
@@ -618,16 +994,146 @@ def edit_task_due_date(task_id):
     return render_template("make-task.html", is_edit=True, gravatar_url=gravatar_url, form=form)
 
 # Delete tasks
-@app.route("/delete-task/<int:task_id>")
+@route("/delete-task/<int:task_id>")
 @login_required
 @creator_only
 def delete_task(task_id):
 
     task_to_delete = db.get_or_404(Task, task_id)
+
+    # Remove the comments in one statement (the ORM cascade leaves them to the database)
+    deletion.delete_task_comments([task_id])
     db.session.delete(task_to_delete)
     db.session.commit()
 
     return redirect(url_for("show_project", project_id=task_to_delete.project_id))
 
+# Create, complete, reassign and delete many tasks in one request, e.g.
+# {"operations": [{"op": "create", "project_id": 1, "task": "Write docs", "due_date": "2026-11-01", "assignee_id": 2},
+#                 {"op": "complete", "task_id": 7}, {"op": "reassign", "task_id": 8, "assignee_id": 3}, {"op": "delete", "task_id": 9}]}
+@route("/api/tasks/bulk", methods=['POST'])
+@login_required
+def bulk_tasks():
+
+    # Only JSON bodies are accepted, which browsers can't send cross-site without a CORS preflight
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("operations"), list):
+        return jsonify(error='Expected a JSON object with an "operations" list'), 400
+
+    operations = data["operations"]
+    if len(operations) > current_app.config["BULK_MAX_OPERATIONS"]:
+        return jsonify(error=f"At most {current_app.config['BULK_MAX_OPERATIONS']} operations per request"), 413
+
+    # All the changes are committed together
+    results = apply_task_operations(operations, current_user, guest=current_user.email == "guest@email.com")
+    db.session.commit()
+
+    return jsonify(results=results)
+
+def create_app(config=None):
+    """Build the app from the environment (and config, which overrides it).
+
+    Nothing here connects to the database or starts threads or processes, so it can run once in a
+    gunicorn master with --preload before the workers fork. Schema changes are applied separately with
+    `flask --app main db upgrade`.
+    """
+    load_dotenv()
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
+    app.config['PAGE_SIZE'] = int(os.getenv("PAGE_SIZE", 50))
+    app.config['MAX_PAGE_SIZE'] = int(os.getenv("MAX_PAGE_SIZE", 200))
+    app.config['COMMENT_PAGE_SIZE'] = int(os.getenv("COMMENT_PAGE_SIZE", 20))
+    app.config['SLOW_REQUEST_THRESHOLD'] = float(os.getenv("SLOW_REQUEST_THRESHOLD", 1.0))
+    app.config['BULK_MAX_OPERATIONS'] = int(os.getenv("BULK_MAX_OPERATIONS", 1000))
+    app.config['USER_SEARCH_LIMIT'] = int(os.getenv("USER_SEARCH_LIMIT", 10))
+    # Projects with more tasks than this are deleted in the background, DELETE_CHUNK_SIZE tasks per transaction
+    app.config['DELETE_IN_BACKGROUND_AFTER'] = int(os.getenv("DELETE_IN_BACKGROUND_AFTER", 5000))
+    app.config['DELETE_CHUNK_SIZE'] = int(os.getenv("DELETE_CHUNK_SIZE", 1000))
+    # `flask --app main archive-tasks` moves tasks completed more than this many days ago to the archive
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv("ARCHIVE_AFTER_DAYS", 30))
+    # `flask --app main send-reminders` covers open tasks due in the next REMINDER_DAYS_AHEAD days or overdue by up to
+    # REMINDER_OVERDUE_DAYS, and sends the digests with REMINDER_NOTIFIER ("module:function"; reminders:write_digest
+    # appends them to REMINDER_OUTBOX)
+    app.config['REMINDER_DAYS_AHEAD'] = int(os.getenv("REMINDER_DAYS_AHEAD", 1))
+    app.config['REMINDER_OVERDUE_DAYS'] = int(os.getenv("REMINDER_OVERDUE_DAYS", 30))
+    app.config['REMINDER_NOTIFIER'] = os.getenv("REMINDER_NOTIFIER", "reminders:print_digest")
+    app.config['REMINDER_OUTBOX'] = os.getenv("REMINDER_OUTBOX", os.path.join(app.instance_path, "reminders.jsonl"))
+    # Password hashing method (werkzeug format, including the cost), salt length and hashing processes per worker
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000000")
+    app.config['PASSWORD_SALT_LENGTH'] = int(os.getenv("PASSWORD_SALT_LENGTH", 16))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    # Serve avatars from a local disk cache (/avatar/<hash>) instead of linking to gravatar.com
+    app.config['AVATAR_PROXY'] = os.getenv("AVATAR_PROXY", "") == "1"
+    app.config['AVATAR_CACHE_DIR'] = os.getenv("AVATAR_CACHE_DIR", os.path.join(app.instance_path, "avatars"))
+    app.config['AVATAR_CACHE_BYTES'] = int(os.getenv("AVATAR_CACHE_BYTES", 50 * 1024 * 1024))
+    app.config['AVATAR_MAX_AGE'] = int(os.getenv("AVATAR_MAX_AGE", 7 * 24 * 3600))
+    # "module:function" returning (content type, image bytes); avatars:fetch_placeholder works offline
+    app.config['AVATAR_FETCHER'] = os.getenv("AVATAR_FETCHER", "avatars:fetch_gravatar")
+    # The database (schema changes are applied with `flask --app main db upgrade`)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DB_URI",'sqlite:///todos.db')
+    # Optional read replica for the pages marked with @reads_from_replica
+    if os.getenv("REPLICA_DB_URI"):
+        app.config['SQLALCHEMY_BINDS'] = {routing.REPLICA: os.getenv("REPLICA_DB_URI")}
+    # How long a browser keeps reading from the primary after it wrote something
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+    if config:
+        app.config.update(config)
+
+    ckeditor.init_app(app)
+    bootstrap.init_app(app)
+    metrics.init_app(app)
+    password_hasher.init_app(app)
+    login_manager.init_app(app)
+
+    db.init_app(app)
+    routing.init_app(app, db)
+
+    with app.app_context():
+        app_engines.update(db.engines.values())
+
+    # Migrations only run from the flask command, so web workers don't pay for importing Alembic
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+
+        # The full-text search index is managed by its migration and triggers, not by autogenerate
+        Migrate(app, db, render_as_batch=True, include_name=full_text_search.include_name)
+
+    # `flask --app main export-data` and `import-data`
+    transfer.init_app(app)
+    # `flask --app main resume-deletes`
+    deletion.init_app(app)
+    # `flask --app main archive-tasks`
+    archive.init_app(app)
+    # `flask --app main send-reminders`
+    reminders.init_app(app)
+    # `flask --app main build-assets`, asset_url() and the static files view
+    assets.init_app(app)
+
+    # Cache the users loaded for each request, shared between workers when a CACHE_URL is configured
+    app.extensions["user_cache"] = make_cache(
+        "user",
+        url=os.getenv("CACHE_URL"),
+        maxsize=int(os.getenv("USER_CACHE_SIZE", 1024)),
+        ttl=int(os.getenv("USER_CACHE_TTL", 300))
+    )
+
+    # Cache of rendered project and task pages, keyed by their ETag (which includes the viewer and the page version)
+    app.extensions["page_cache"] = TTLCache(
+        maxsize=int(os.getenv("PAGE_CACHE_SIZE", 512)),
+        ttl=int(os.getenv("PAGE_CACHE_TTL", 600)),
+        max_bytes=int(os.getenv("PAGE_CACHE_BYTES", 32 * 1024 * 1024))
+    )
+
+    app.extensions["avatar_urls"] = lru_cache(maxsize=4096)(avatar_url)
+
+    if app.config["AVATAR_PROXY"]:
+        app.extensions["avatar_cache"] = avatars.AvatarCache(app.config["AVATAR_CACHE_DIR"], app.config["AVATAR_CACHE_BYTES"])
+
+    for rule, view, options in routes:
+        app.add_url_rule(rule, view_func=view, **options)
+
+    return app
+
 if __name__ == "__main__":
-    app.run(debug=False)
\ No newline at end of file
+    create_app().run(debug=False)
\ No newline at end of file
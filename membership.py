@@ -0,0 +1,157 @@
+from collections import Counter
+
+from flask import g, has_app_context
+from sqlalchemy import event, inspect, select, delete, union_all, literal, func, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Project, Task, ArchivedTask, ProjectMember
+
+
+def is_project_member(project_id, user_id):
+
+    # Cache the answer for the rest of the request (decorators and views may ask more than once)
+    cache = g.setdefault("project_member_cache", {})
+
+    if (project_id, user_id) not in cache:
+        result = db.session.execute(
+            select(ProjectMember.project_id).where(
+                and_(ProjectMember.project_id == project_id, ProjectMember.user_id == user_id)
+            )
+        )
+        cache[(project_id, user_id)] = result.first() is not None
+
+    return cache[(project_id, user_id)]
+
+
+def _member_refs_query(project_ids):
+
+    # One row per reference to a user: the project creator, and each (archived) task's creator and assignee
+    refs = union_all(
+        select(Project.id.label("project_id"), Project.creator_id.label("user_id"), literal(1).label("is_creator"), literal(0).label("task_count"))
+        .where(Project.id.in_(project_ids)),
+        select(Task.project_id, Task.creator_id, literal(0), literal(1)).where(Task.project_id.in_(project_ids)),
+        select(Task.project_id, Task.assignee_id, literal(0), literal(1)).where(Task.project_id.in_(project_ids)),
+        # Archived tasks keep their creators and assignees in the project
+        select(ArchivedTask.project_id, ArchivedTask.creator_id, literal(0), literal(1)).where(ArchivedTask.project_id.in_(project_ids)),
+        select(ArchivedTask.project_id, ArchivedTask.assignee_id, literal(0), literal(1)).where(ArchivedTask.project_id.in_(project_ids)),
+    ).subquery()
+
+    return select(
+        refs.c.project_id,
+        refs.c.user_id,
+        func.max(refs.c.is_creator) == 1,
+        func.sum(refs.c.task_count),
+    ).group_by(refs.c.project_id, refs.c.user_id)
+
+
+def refresh_project_members(project_ids, connection=None):
+
+    # Rebuild the members of the given projects from their tasks (used after set-based task changes)
+    project_ids = list(project_ids)
+    if not project_ids:
+        return
+
+    connection = connection or db.session.connection()
+    connection.execute(delete(ProjectMember).where(ProjectMember.project_id.in_(project_ids)))
+    connection.execute(
+        ProjectMember.__table__.insert().from_select(
+            ["project_id", "user_id", "is_creator", "task_count"], _member_refs_query(project_ids)
+        )
+    )
+
+    _clear_cache()
+
+
+def _clear_cache():
+    if has_app_context():
+        g.pop("project_member_cache", None)
+
+
+def old_and_new(state, key):
+
+    # Values of an attribute before and after the flush
+    history = state.attrs[key].history
+    new = history.added[0] if history.added else (history.unchanged[0] if history.unchanged else None)
+    old = history.deleted[0] if history.deleted else new
+
+    return old, new
+
+
+def _apply_changes(connection, task_counts, creators, deleted_projects):
+
+    table = ProjectMember.__table__
+
+    rows = [
+        {"project_id": project_id, "user_id": user_id, "is_creator": (project_id, user_id) in creators, "task_count": task_counts[(project_id, user_id)]}
+        for project_id, user_id in set(task_counts) | creators
+        if task_counts[(project_id, user_id)] or (project_id, user_id) in creators
+    ]
+
+    if rows:
+        if connection.dialect.name == "postgresql":
+            insert = postgresql.insert(table)
+        else:
+            insert = sqlite.insert(table)
+
+        connection.execute(
+            insert.on_conflict_do_update(
+                index_elements=[table.c.project_id, table.c.user_id],
+                set_={
+                    "task_count": table.c.task_count + insert.excluded.task_count,
+                    "is_creator": or_(table.c.is_creator, insert.excluded.is_creator),
+                },
+            ),
+            rows,
+        )
+
+        # Users that no longer create or own any task of the project lose access to it
+        connection.execute(
+            delete(table).where(
+                and_(
+                    table.c.project_id.in_({row["project_id"] for row in rows}),
+                    table.c.task_count <= 0,
+                    table.c.is_creator == False,
+                )
+            )
+        )
+
+    if deleted_projects:
+        connection.execute(delete(table).where(table.c.project_id.in_(deleted_projects)))
+
+    if rows or deleted_projects:
+        _clear_cache()
+
+
+@event.listens_for(db.session, "after_flush")
+def record_membership_changes(session, flush_context):
+
+    # Keep project_members in step with every task create/reassign/delete flushed through the ORM
+    task_counts = Counter()
+    creators = set()
+    deleted_projects = set()
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            task_counts[(obj.project_id, obj.creator_id)] += 1
+            task_counts[(obj.project_id, obj.assignee_id)] += 1
+        elif isinstance(obj, Project):
+            creators.add((obj.id, obj.creator_id))
+
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            state = inspect(obj)
+            old_project_id, new_project_id = old_and_new(state, "project_id")
+            for key in ("creator_id", "assignee_id"):
+                old_user_id, new_user_id = old_and_new(state, key)
+                if (old_project_id, old_user_id) != (new_project_id, new_user_id):
+                    task_counts[(old_project_id, old_user_id)] -= 1
+                    task_counts[(new_project_id, new_user_id)] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            task_counts[(obj.project_id, obj.creator_id)] -= 1
+            task_counts[(obj.project_id, obj.assignee_id)] -= 1
+        elif isinstance(obj, Project):
+            deleted_projects.add(obj.id)
+
+    _apply_changes(session.connection(), task_counts, creators, deleted_projects)
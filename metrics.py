@@ -0,0 +1,191 @@
+import bisect
+import threading
+import time
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the SQL statements per request histogram buckets
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class Counter:
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(key))} {value}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        # Per label set: [count in each bucket (plus +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            bucket_counts, _, _ = self._values[key]
+            bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key][1] += value
+            self._values[key][2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._values.items()):
+                labels = dict(key)
+                cumulative = 0
+                for upper_bound, bucket_count in zip(self.buckets + ("+Inf",), bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': upper_bound})} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = []
+        # Callables returning extra metric lines when the registry is rendered (e.g. cache statistics)
+        self._collectors = []
+
+    def counter(self, name, documentation):
+        metric = Counter(name, documentation)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_latency = registry.histogram("todo_request_duration_seconds", "Time spent handling a request.")
+request_sql_statements = registry.histogram(
+    "todo_request_sql_statements", "Number of SQL statements issued while handling a request.", COUNT_BUCKETS
+)
+sql_statements = registry.counter("todo_sql_statements_total", "SQL statements issued, by endpoint.")
+sql_time = registry.counter("todo_sql_duration_seconds_total", "Time spent executing SQL statements, by endpoint.")
+template_time = registry.histogram("todo_template_render_seconds", "Time spent rendering a Jinja template.")
+
+
+def cache_collector(caches):
+
+    # Expose the hit/miss counters of the named caches (see cache.py), one metric family per counter
+    # with a sample for each cache
+    def collect():
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        lines = []
+        for key in ("hits", "misses"):
+            lines += [f"# HELP todo_cache_{key}_total Cache {key}.", f"# TYPE todo_cache_{key}_total counter"]
+            lines += [f"todo_cache_{key}_total{_format_labels({'cache': name})} {values[key]}" for name, values in stats.items()]
+        return lines
+
+    return collect
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+
+    # Kept on the statement's own execution context, so a statement that fails (and never reaches
+    # after_cursor_execute) leaves nothing behind on the pooled connection
+    context.statement_start_time = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.statement_start_time
+
+    # Statements issued outside a request (CLI commands, migrations) are not attributed to an endpoint
+    if has_request_context() and "sql_statements" in g:
+        g.sql_statements.append((elapsed, statement))
+
+
+def init_app(app):
+
+    app.config.setdefault("SLOW_REQUEST_THRESHOLD", 1.0)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start_time = time.perf_counter()
+        g.sql_statements = []
+
+    @app.teardown_request
+    def record_request(exception=None):
+        if "request_start_time" not in g:
+            return
+
+        elapsed = time.perf_counter() - g.request_start_time
+        endpoint = request.endpoint or "unknown"
+        statements = g.sql_statements
+
+        request_latency.observe(elapsed, endpoint=endpoint, method=request.method)
+        request_sql_statements.observe(len(statements), endpoint=endpoint)
+        sql_statements.inc(len(statements), endpoint=endpoint)
+        sql_time.inc(sum(statement_time for statement_time, _ in statements), endpoint=endpoint)
+
+        # Log the SQL issued by slow requests to see why they were slow
+        if elapsed > app.config["SLOW_REQUEST_THRESHOLD"]:
+            app.logger.warning(
+                "Slow request %s %s took %.3fs with %d SQL statements:\n%s",
+                request.method,
+                request.full_path,
+                elapsed,
+                len(statements),
+                "\n".join(f"  [{statement_time * 1000:.1f}ms] {statement}" for statement_time, statement in statements),
+            )
+
+    def start_template_timer(sender, template, context, **extra):
+        g.setdefault("template_start_times", []).append(time.perf_counter())
+
+    def record_template(sender, template, context, **extra):
+        if g.get("template_start_times"):
+            template_time.observe(time.perf_counter() - g.template_start_times.pop(), template=template.name)
+
+    before_render_template.connect(start_template_timer, app, weak=False)
+    template_rendered.connect(record_template, app, weak=False)
@@ -0,0 +1,82 @@
+"""task archive
+
+Revision ID: 0e7a9c3f5b18
+Revises: d81f4c2b7a65
+Create Date: 2026-10-17 06:21:07.347991
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0e7a9c3f5b18'
+down_revision = 'd81f4c2b7a65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Added as nullable, so SQLite doesn't rebuild the table (and drop its search triggers)
+    op.add_column("tasks", sa.Column("completed_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_tasks_completed_at", "tasks", ["completed_at"])
+
+    # Tasks completed before now start their archive countdown today
+    op.execute("UPDATE tasks SET completed_at = CURRENT_TIMESTAMP WHERE is_complete")
+
+    op.create_table(
+        "archived_tasks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("task_text", sa.String(length=100), nullable=False),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.Column("creator_id", sa.Integer(), nullable=False),
+        sa.Column("assignee_id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["creator_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["assignee_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_archived_tasks_project_id_id", "archived_tasks", ["project_id", "id"])
+
+    op.create_table(
+        "archived_comments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("comment_text", sa.String(length=100), nullable=False),
+        sa.Column("comment_author_id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["comment_author_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["task_id"], ["archived_tasks.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_archived_comments_task_id_id", "archived_comments", ["task_id", "id"])
+
+
+def downgrade():
+    # Put the archived tasks and their comments back under their old ids (tasks whose id has been
+    # reused since can't be restored and are dropped with the archive)
+    op.execute("""
+        INSERT INTO tasks (id, task_text, due_date, is_complete, completed_at, creator_id, assignee_id, project_id, version)
+        SELECT task_id, task_text, due_date, TRUE, completed_at, creator_id, assignee_id, project_id, 1
+        FROM archived_tasks
+        WHERE task_id NOT IN (SELECT id FROM tasks)
+    """)
+    op.execute("""
+        INSERT INTO comments (comment_text, comment_author_id, task_id)
+        SELECT archived_comments.comment_text, archived_comments.comment_author_id, archived_tasks.task_id
+        FROM archived_comments JOIN archived_tasks ON archived_tasks.id = archived_comments.task_id
+        JOIN tasks ON tasks.id = archived_tasks.task_id AND tasks.completed_at IS NOT DISTINCT FROM archived_tasks.completed_at
+        ORDER BY archived_comments.id
+    """)
+
+    op.drop_index("ix_archived_comments_task_id_id", table_name="archived_comments")
+    op.drop_table("archived_comments")
+    op.drop_index("ix_archived_tasks_project_id_id", table_name="archived_tasks")
+    op.drop_table("archived_tasks")
+
+    # Not in batch mode: SQLite can drop the column in place, without rebuilding the table
+    op.drop_index("ix_tasks_completed_at", table_name="tasks")
+    op.drop_column("tasks", "completed_at")
@@ -0,0 +1,38 @@
+"""longer password hashes
+
+Revision ID: 2c6e9a0b4d83
+Revises: e5b8f2a4c7d1
+Create Date: 2026-10-17 06:09:28.819416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c6e9a0b4d83'
+down_revision = 'e5b8f2a4c7d1'
+branch_labels = None
+depends_on = None
+
+
+def restore_expression_indexes():
+
+    # SQLite rebuilds the table to change the column type and can't carry the expression indexes over
+    if op.get_context().dialect.name == "sqlite":
+        op.execute("CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_users_name_lower ON users (lower(name))")
+
+
+def upgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.alter_column("password", existing_type=sa.String(length=100), type_=sa.String(length=255))
+
+    restore_expression_indexes()
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.alter_column("password", existing_type=sa.String(length=255), type_=sa.String(length=100))
+
+    restore_expression_indexes()
@@ -0,0 +1,80 @@
+"""baseline schema
+
+Revision ID: 3f1c2a9d0b11
+Revises: 
+Create Date: 2026-10-17 05:52:05.371313
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d0b11'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by the old import-time db.create_all() already have these tables,
+    # so only create the ones that are missing
+    existing_tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if "users" not in existing_tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("email", sa.String(length=100), nullable=False),
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("password", sa.String(length=100), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("email"),
+        )
+
+    if "projects" not in existing_tables:
+        op.create_table(
+            "projects",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(length=250), nullable=False),
+            sa.Column("description", sa.Text(), nullable=False),
+            sa.Column("date", sa.String(length=250), nullable=False),
+            sa.Column("creator_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["creator_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if "tasks" not in existing_tables:
+        op.create_table(
+            "tasks",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("task_text", sa.String(length=100), nullable=False),
+            sa.Column("due_date", sa.String(length=250), nullable=False),
+            sa.Column("is_complete", sa.Boolean(), nullable=False),
+            sa.Column("creator_id", sa.Integer(), nullable=False),
+            sa.Column("assignee_id", sa.Integer(), nullable=False),
+            sa.Column("project_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["assignee_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["creator_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if "comments" not in existing_tables:
+        op.create_table(
+            "comments",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("comment_text", sa.String(length=100), nullable=False),
+            sa.Column("comment_author_id", sa.Integer(), nullable=False),
+            sa.Column("task_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["comment_author_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["task_id"], ["tasks.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+
+def downgrade():
+    op.drop_table("comments")
+    op.drop_table("tasks")
+    op.drop_table("projects")
+    op.drop_table("users")
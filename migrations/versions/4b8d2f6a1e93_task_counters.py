@@ -0,0 +1,44 @@
+"""task counters
+
+Revision ID: 4b8d2f6a1e93
+Revises: a3c7e1f5b902
+Create Date: 2026-10-17 06:15:12.663866
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8d2f6a1e93'
+down_revision = 'a3c7e1f5b902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "task_counts",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("assignee_id", sa.Integer(), nullable=False),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("is_complete", sa.Boolean(), nullable=False),
+        sa.Column("task_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.ForeignKeyConstraint(["assignee_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("project_id", "assignee_id", "due_date", "is_complete"),
+    )
+    op.create_index("ix_task_counts_assignee_id", "task_counts", ["assignee_id", "is_complete", "due_date"])
+
+    # Count the existing tasks in one INSERT ... SELECT
+    op.execute("""
+        INSERT INTO task_counts (project_id, assignee_id, due_date, is_complete, task_count)
+        SELECT project_id, assignee_id, due_date, is_complete, COUNT(*)
+        FROM tasks
+        GROUP BY project_id, assignee_id, due_date, is_complete
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_task_counts_assignee_id", table_name="task_counts")
+    op.drop_table("task_counts")
@@ -0,0 +1,49 @@
+"""project members
+
+Revision ID: 51a0e6b8c9d4
+Revises: c4d9e0f7a312
+Create Date: 2026-10-17 05:55:59.300289
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '51a0e6b8c9d4'
+down_revision = 'c4d9e0f7a312'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "project_members",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("is_creator", sa.Boolean(), nullable=False),
+        sa.Column("task_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("project_id", "user_id"),
+    )
+    op.create_index("ix_project_members_user_id", "project_members", ["user_id"])
+
+    # Fill the table from the existing projects and tasks in one INSERT ... SELECT
+    op.execute("""
+        INSERT INTO project_members (project_id, user_id, is_creator, task_count)
+        SELECT project_id, user_id, MAX(is_creator) = 1, SUM(task_count)
+        FROM (
+            SELECT id AS project_id, creator_id AS user_id, 1 AS is_creator, 0 AS task_count FROM projects
+            UNION ALL
+            SELECT project_id, creator_id, 0, 1 FROM tasks
+            UNION ALL
+            SELECT project_id, assignee_id, 0, 1 FROM tasks
+        ) AS refs
+        GROUP BY project_id, user_id
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_project_members_user_id", table_name="project_members")
+    op.drop_table("project_members")
@@ -0,0 +1,27 @@
+"""comment pagination index
+
+Revision ID: 6f1d3b8e2a57
+Revises: 2c6e9a0b4d83
+Create Date: 2026-10-17 06:10:43.650621
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1d3b8e2a57'
+down_revision = '2c6e9a0b4d83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (task_id, id) serves both the task filter and the newest-first order, so it replaces the task_id index
+    op.create_index("ix_comments_task_id_id", "comments", ["task_id", "id"])
+    op.drop_index("ix_comments_task_id", table_name="comments")
+
+
+def downgrade():
+    op.create_index("ix_comments_task_id", "comments", ["task_id"])
+    op.drop_index("ix_comments_task_id_id", table_name="comments")
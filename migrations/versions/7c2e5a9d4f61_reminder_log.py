@@ -0,0 +1,37 @@
+"""reminder log
+
+Revision ID: 7c2e5a9d4f61
+Revises: 0e7a9c3f5b18
+Create Date: 2026-10-17 07:02:44.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e5a9d4f61'
+down_revision = '0e7a9c3f5b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_tasks_open_due", "tasks", ["is_complete", "due_date", "id"])
+
+    op.create_table(
+        "reminder_log",
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("assignee_id", sa.Integer(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("task_id", "kind", "due_date"),
+    )
+    op.create_index("ix_reminder_log_due_date", "reminder_log", ["due_date"])
+
+
+def downgrade():
+    op.drop_index("ix_reminder_log_due_date", table_name="reminder_log")
+    op.drop_table("reminder_log")
+    op.drop_index("ix_tasks_open_due", table_name="tasks")
@@ -0,0 +1,111 @@
+"""search index
+
+Revision ID: 7d3a5c1e9f20
+Revises: 9e2f7b13a6c8
+Create Date: 2026-10-17 06:06:38.348975
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3a5c1e9f20'
+down_revision = '9e2f7b13a6c8'
+branch_labels = None
+depends_on = None
+
+
+# Indexed tables: (id offset, kind, body, task id, columns whose updates change the indexed row).
+# "{row}" is NEW or OLD in the triggers and the table itself in the backfill.
+SOURCES = {
+    "tasks": (0, "task", "{row}.task_text", "{row}.id", ["task_text"]),
+    "projects": (1, "project", "{row}.title || ' ' || COALESCE({row}.description, '')", "NULL", ["title", "description"]),
+    "comments": (2, "comment", "{row}.comment_text", "{row}.task_id", ["comment_text", "task_id"]),
+}
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        upgrade_postgresql()
+    else:
+        upgrade_sqlite()
+
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        for table in SOURCES:
+            op.execute(f"DROP TRIGGER search_index_{table} ON {table}")
+            op.execute(f"DROP FUNCTION search_index_{table}()")
+    else:
+        for table in SOURCES:
+            for event in ("insert", "update", "delete"):
+                op.execute(f"DROP TRIGGER search_index_{table}_{event}")
+
+    op.execute("DROP TABLE search_index")
+
+
+def upgrade_sqlite():
+    op.execute("""
+        CREATE VIRTUAL TABLE search_index USING fts5(
+            body, kind UNINDEXED, object_id UNINDEXED, task_id UNINDEXED, tokenize = 'porter unicode61'
+        )
+    """)
+
+    for table, (offset, kind, body, task_id, columns) in SOURCES.items():
+        insert = f"""
+            INSERT INTO search_index (rowid, body, kind, object_id, task_id)
+            VALUES (NEW.id * 3 + {offset}, {body.format(row="NEW")}, '{kind}', NEW.id, {task_id.format(row="NEW")});
+        """
+        delete = f"DELETE FROM search_index WHERE rowid = OLD.id * 3 + {offset};"
+
+        op.execute(f"CREATE TRIGGER search_index_{table}_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        op.execute(f"CREATE TRIGGER search_index_{table}_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN {delete} {insert} END")
+        op.execute(f"CREATE TRIGGER search_index_{table}_delete AFTER DELETE ON {table} BEGIN {delete} END")
+
+        op.execute(f"""
+            INSERT INTO search_index (rowid, body, kind, object_id, task_id)
+            SELECT id * 3 + {offset}, {body.format(row=table)}, '{kind}', id, {task_id.format(row=table)} FROM {table}
+        """)
+
+
+def upgrade_postgresql():
+    op.execute("""
+        CREATE TABLE search_index (
+            id BIGINT PRIMARY KEY,
+            kind VARCHAR(10) NOT NULL,
+            object_id INTEGER NOT NULL,
+            task_id INTEGER,
+            document TSVECTOR NOT NULL
+        )
+    """)
+    op.execute("CREATE INDEX ix_search_index_document ON search_index USING GIN (document)")
+
+    for table, (offset, kind, body, task_id, columns) in SOURCES.items():
+        # Descriptions and comments are HTML from the editor, so index the text without the tags
+        def document(row):
+            return f"to_tsvector('english', regexp_replace({body.format(row=row)}, '<[^>]*>', ' ', 'g'))"
+
+        op.execute(f"""
+            CREATE FUNCTION search_index_{table}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP <> 'INSERT' THEN
+                    DELETE FROM search_index WHERE id = OLD.id::bigint * 3 + {offset};
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    INSERT INTO search_index (id, kind, object_id, task_id, document)
+                    VALUES (NEW.id::bigint * 3 + {offset}, '{kind}', NEW.id, {task_id.format(row="NEW")}, {document("NEW")});
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER search_index_{table} AFTER INSERT OR UPDATE OF {', '.join(columns)} OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION search_index_{table}()
+        """)
+
+        op.execute(f"""
+            INSERT INTO search_index (id, kind, object_id, task_id, document)
+            SELECT id::bigint * 3 + {offset}, '{kind}', id, {task_id.format(row=table)}, {document(table)} FROM {table}
+        """)
@@ -0,0 +1,108 @@
+"""native date columns and query indexes
+
+Revision ID: 8b7e41c5d2a0
+Revises: 3f1c2a9d0b11
+Create Date: 2026-10-17 05:52:06.721362
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b7e41c5d2a0'
+down_revision = '3f1c2a9d0b11'
+branch_labels = None
+depends_on = None
+
+
+# Projects stored their creation date as e.g. "October 17, 2026"; tasks stored due dates as "2026-10-17"
+PROJECT_DATE_FORMAT = "%B %d, %Y"
+
+
+def _parse_date(value, date_formats=(PROJECT_DATE_FORMAT, "%Y-%m-%d")):
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _check_dates(table, column, dates):
+
+    # The columns are NOT NULL and no date can be made up, so stop with the rows to fix by hand
+    unparsed = sorted(row_id for row_id, value in dates.items() if value is None)
+    if unparsed:
+        raise ValueError(
+            f"{table}.{column} is not a date in the rows with ids {', '.join(map(str, unparsed))}; "
+            "correct them and run the upgrade again"
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        # Convert every row in place as part of the column type change
+        op.execute("ALTER TABLE projects ALTER COLUMN date TYPE DATE USING to_date(date, 'FMMonth DD, YYYY')")
+        op.execute("ALTER TABLE tasks ALTER COLUMN due_date TYPE DATE USING due_date::date")
+    else:
+        # Rewrite the project dates to ISO format in one executemany, then change the column types
+        # (SQLite copies the rows into the rebuilt tables with a single INSERT ... SELECT)
+        dates = {row.id: _parse_date(row.date) for row in bind.execute(sa.text("SELECT id, date FROM projects"))}
+        _check_dates("projects", "date", dates)
+        _check_dates("tasks", "due_date", {
+            row.id: _parse_date(row.due_date, ("%Y-%m-%d",)) for row in bind.execute(sa.text("SELECT id, due_date FROM tasks"))
+        })
+
+        if dates:
+            bind.execute(
+                sa.text("UPDATE projects SET date = :date WHERE id = :id"),
+                [{"id": row_id, "date": value.isoformat()} for row_id, value in dates.items()],
+            )
+
+        # Declaring the new type through reflect_args keeps the batch copy from wrapping the values in
+        # CAST(... AS DATE), which SQLite would turn into a number
+        with op.batch_alter_table("projects", recreate="always", reflect_args=[sa.Column("date", sa.Date(), nullable=False)]):
+            pass
+
+        with op.batch_alter_table("tasks", recreate="always", reflect_args=[sa.Column("due_date", sa.Date(), nullable=False)]):
+            pass
+
+    op.create_index("ix_projects_creator_id", "projects", ["creator_id"])
+    op.create_index("ix_tasks_creator_id", "tasks", ["creator_id"])
+    op.create_index("ix_tasks_assignee_open_due", "tasks", ["assignee_id", "is_complete", "due_date"])
+    op.create_index("ix_tasks_project_open", "tasks", ["project_id", "is_complete"])
+    op.create_index("ix_comments_task_id", "comments", ["task_id"])
+
+
+def downgrade():
+    op.drop_index("ix_comments_task_id", table_name="comments")
+    op.drop_index("ix_tasks_project_open", table_name="tasks")
+    op.drop_index("ix_tasks_assignee_open_due", table_name="tasks")
+    op.drop_index("ix_tasks_creator_id", table_name="tasks")
+    op.drop_index("ix_projects_creator_id", table_name="projects")
+
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        op.execute("ALTER TABLE projects ALTER COLUMN date TYPE VARCHAR(250) USING to_char(date, 'FMMonth DD, YYYY')")
+        op.execute("ALTER TABLE tasks ALTER COLUMN due_date TYPE VARCHAR(250) USING to_char(due_date, 'YYYY-MM-DD')")
+    else:
+        with op.batch_alter_table("tasks", recreate="always", reflect_args=[sa.Column("due_date", sa.String(length=250), nullable=False)]):
+            pass
+
+        with op.batch_alter_table("projects", recreate="always", reflect_args=[sa.Column("date", sa.String(length=250), nullable=False)]):
+            pass
+
+        dates = {row.id: _parse_date(row.date) for row in bind.execute(sa.text("SELECT id, date FROM projects"))}
+        _check_dates("projects", "date", dates)
+
+        if dates:
+            bind.execute(
+                sa.text("UPDATE projects SET date = :date WHERE id = :id"),
+                [{"id": row_id, "date": value.strftime(PROJECT_DATE_FORMAT)} for row_id, value in dates.items()],
+            )
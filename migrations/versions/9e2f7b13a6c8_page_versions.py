@@ -0,0 +1,32 @@
+"""page versions
+
+Revision ID: 9e2f7b13a6c8
+Revises: 51a0e6b8c9d4
+Create Date: 2026-10-17 05:59:29.629842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e2f7b13a6c8'
+down_revision = '51a0e6b8c9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("projects") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.drop_column("version")
+
+    with op.batch_alter_table("projects") as batch_op:
+        batch_op.drop_column("version")
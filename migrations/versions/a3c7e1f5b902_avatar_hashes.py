@@ -0,0 +1,47 @@
+"""avatar hashes
+
+Revision ID: a3c7e1f5b902
+Revises: 6f1d3b8e2a57
+Create Date: 2026-10-17 06:12:21.165682
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c7e1f5b902'
+down_revision = '6f1d3b8e2a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable so SQLite can add it in place (rebuilding users would drop its expression indexes)
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("avatar_hash", sa.String(length=64), nullable=True))
+
+    users = sa.table("users", sa.column("id", sa.Integer), sa.column("email", sa.String), sa.column("avatar_hash", sa.String))
+    connection = op.get_bind()
+
+    # Hash the existing emails in batches (the same hash as avatars.email_hash)
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(users.c.id, users.c.email).where(users.c.id > last_id).order_by(users.c.id).limit(1000)
+        ).all()
+        if not rows:
+            break
+
+        connection.execute(
+            users.update().where(users.c.id == sa.bindparam("user_id")).values(avatar_hash=sa.bindparam("hash")),
+            [{"user_id": id, "hash": hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()} for id, email in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("avatar_hash")
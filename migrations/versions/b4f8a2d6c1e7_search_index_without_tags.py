@@ -0,0 +1,62 @@
+"""search index without tags
+
+Revision ID: b4f8a2d6c1e7
+Revises: 7c2e5a9d4f61
+Create Date: 2026-10-17 08:12:05.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4f8a2d6c1e7'
+down_revision = '7c2e5a9d4f61'
+branch_labels = None
+depends_on = None
+
+
+# Indexed tables, as in the search index migration: (id offset, kind, body, task id, columns whose updates
+# change the indexed row). "{row}" is NEW in the triggers and the table itself in the backfill.
+SOURCES = {
+    "tasks": (0, "task", "{row}.task_text", "{row}.id", ["task_text"]),
+    "projects": (1, "project", "{row}.title || ' ' || COALESCE({row}.description, '')", "NULL", ["title", "description"]),
+    "comments": (2, "comment", "{row}.comment_text", "{row}.task_id", ["comment_text", "task_id"]),
+}
+
+
+def upgrade():
+    # Postgres already indexes the text without the tags
+    if op.get_context().dialect.name == "sqlite":
+        # strip_tags() is registered on every SQLite connection by search.py
+        rebuild_sqlite(lambda body: f"strip_tags({body})")
+
+
+def downgrade():
+    if op.get_context().dialect.name == "sqlite":
+        rebuild_sqlite(lambda body: body)
+
+
+def rebuild_sqlite(document):
+
+    # Recreate the triggers so they index document(body), then reindex every row the same way
+    op.execute("DELETE FROM search_index")
+
+    for table, (offset, kind, body, task_id, columns) in SOURCES.items():
+        for event in ("insert", "update", "delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS search_index_{table}_{event}")
+
+        insert = f"""
+            INSERT INTO search_index (rowid, body, kind, object_id, task_id)
+            VALUES (NEW.id * 3 + {offset}, {document(body.format(row="NEW"))}, '{kind}', NEW.id, {task_id.format(row="NEW")});
+        """
+        delete = f"DELETE FROM search_index WHERE rowid = OLD.id * 3 + {offset};"
+
+        op.execute(f"CREATE TRIGGER search_index_{table}_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        op.execute(f"CREATE TRIGGER search_index_{table}_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN {delete} {insert} END")
+        op.execute(f"CREATE TRIGGER search_index_{table}_delete AFTER DELETE ON {table} BEGIN {delete} END")
+
+        op.execute(f"""
+            INSERT INTO search_index (rowid, body, kind, object_id, task_id)
+            SELECT id * 3 + {offset}, {document(body.format(row=table))}, '{kind}', id, {task_id.format(row=table)} FROM {table}
+        """)
@@ -0,0 +1,37 @@
+"""keyset pagination indexes
+
+Revision ID: c4d9e0f7a312
+Revises: 8b7e41c5d2a0
+Create Date: 2026-10-17 05:54:32.106385
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d9e0f7a312'
+down_revision = '8b7e41c5d2a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rebuild the task indexes with the id as the last column so every keyset page is a single index seek
+    op.drop_index("ix_tasks_assignee_open_due", table_name="tasks")
+    op.drop_index("ix_tasks_project_open", table_name="tasks")
+
+    op.create_index("ix_tasks_assignee_open_due", "tasks", ["assignee_id", "is_complete", "due_date", "id"])
+    op.create_index("ix_tasks_assignee_open_project", "tasks", ["assignee_id", "is_complete", "project_id", "id"])
+    op.create_index("ix_tasks_assignee_open_creator", "tasks", ["assignee_id", "is_complete", "creator_id", "id"])
+    op.create_index("ix_tasks_project_open", "tasks", ["project_id", "is_complete", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_tasks_project_open", table_name="tasks")
+    op.drop_index("ix_tasks_assignee_open_creator", table_name="tasks")
+    op.drop_index("ix_tasks_assignee_open_project", table_name="tasks")
+    op.drop_index("ix_tasks_assignee_open_due", table_name="tasks")
+
+    op.create_index("ix_tasks_project_open", "tasks", ["project_id", "is_complete"])
+    op.create_index("ix_tasks_assignee_open_due", "tasks", ["assignee_id", "is_complete", "due_date"])
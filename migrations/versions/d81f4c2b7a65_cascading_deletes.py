@@ -0,0 +1,79 @@
+"""cascading deletes
+
+Revision ID: d81f4c2b7a65
+Revises: 4b8d2f6a1e93
+Create Date: 2026-10-17 06:17:23.181452
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f4c2b7a65'
+down_revision = '4b8d2f6a1e93'
+branch_labels = None
+depends_on = None
+
+
+# Foreign keys that cascade deletes from projects down to tasks and comments: (table, column, referred table)
+FOREIGN_KEYS = [
+    ("tasks", "project_id", "projects"),
+    ("comments", "task_id", "tasks"),
+    ("project_members", "project_id", "projects"),
+    ("task_counts", "project_id", "projects"),
+]
+
+# Lets batch mode find SQLite's unnamed foreign keys by name
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+# The search index triggers of the tables SQLite rebuilds (as created by the search index migration)
+SEARCH_SOURCES = {
+    "tasks": (0, "task", "{row}.task_text", "{row}.id", ["task_text"]),
+    "comments": (2, "comment", "{row}.comment_text", "{row}.task_id", ["comment_text", "task_id"]),
+}
+
+
+def replace_foreign_keys(ondelete):
+    sqlite = op.get_context().dialect.name == "sqlite"
+
+    for table, column, referred in FOREIGN_KEYS:
+        # Postgres named the original constraints itself
+        name = f"fk_{table}_{column}_{referred}" if sqlite else f"{table}_{column}_fkey"
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_="foreignkey")
+            batch_op.create_foreign_key(name, referred, [column], ["id"], ondelete=ondelete)
+
+    if sqlite:
+        restore_search_triggers()
+
+
+def restore_search_triggers():
+
+    # SQLite rebuilds the tables to change their foreign keys, and their triggers go with the old tables
+    for table, (offset, kind, body, task_id, columns) in SEARCH_SOURCES.items():
+        insert = f"""
+            INSERT INTO search_index (rowid, body, kind, object_id, task_id)
+            VALUES (NEW.id * 3 + {offset}, {body.format(row="NEW")}, '{kind}', NEW.id, {task_id.format(row="NEW")});
+        """
+        delete = f"DELETE FROM search_index WHERE rowid = OLD.id * 3 + {offset};"
+
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN {delete} {insert} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS search_index_{table}_delete AFTER DELETE ON {table} BEGIN {delete} END")
+
+
+def upgrade():
+    # Earlier project deletes left the comments of the deleted tasks behind
+    op.execute("DELETE FROM comments WHERE task_id NOT IN (SELECT id FROM tasks)")
+
+    replace_foreign_keys("CASCADE")
+
+    op.add_column("projects", sa.Column("pending_delete", sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    # Not in batch mode: SQLite can drop the column in place, without rebuilding the table (and its search triggers)
+    op.drop_column("projects", "pending_delete")
+
+    replace_foreign_keys(None)
@@ -0,0 +1,26 @@
+"""user search indexes
+
+Revision ID: e5b8f2a4c7d1
+Revises: 7d3a5c1e9f20
+Create Date: 2026-10-17 06:08:11.181916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8f2a4c7d1'
+down_revision = '7d3a5c1e9f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_users_email_lower", "users", [sa.text("lower(email)")])
+    op.create_index("ix_users_name_lower", "users", [sa.text("lower(name)")])
+
+
+def downgrade():
+    op.drop_index("ix_users_name_lower", table_name="users")
+    op.drop_index("ix_users_email_lower", table_name="users")
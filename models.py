@@ -0,0 +1,168 @@
+from datetime import date, datetime
+
+from flask_login import UserMixin
+
+from avatars import email_hash
+from routing import RoutingSession
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy import Integer, String, Text, Boolean, Date, DateTime, Index, func, false
+
+# Create Database
+class Base(DeclarativeBase):
+    pass
+
+# The session sends the reads of read-only requests to the replica when there is one (see routing.py)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
+
+# User Table
+class User(UserMixin,db.Model):
+    __tablename__ = "users"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    email: Mapped[str] = mapped_column(String(100), unique=True)
+    name: Mapped[str] = mapped_column(String(100))
+    # Long enough for scrypt and pbkdf2 hashes with 16 character salts (see passwords.py)
+    password: Mapped[str] = mapped_column(String(255))
+    # Gravatar hash of the email, filled in on insert (including bulk inserts) so pages don't rehash it
+    avatar_hash: Mapped[str] = mapped_column(
+        String(64), nullable=True, default=lambda context: email_hash(context.get_current_parameters()["email"])
+    )
+    projects = db.relationship("Project", back_populates="creator")
+    # tasks = db.relationship("Task", back_populates="creator")
+    # assigned_tasks = db.relationship("Task", back_populates="assignee")
+    comments = db.relationship("Comment", back_populates="comment_author")
+
+# Case-insensitive prefix searches for the assignee picker
+Index("ix_users_email_lower", func.lower(User.email))
+Index("ix_users_name_lower", func.lower(User.name))
+
+# Project Table
+class Project(db.Model):
+    __tablename__ = "projects"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    title: Mapped[str] = mapped_column(String(250), nullable=False)
+    description: Mapped[str] = mapped_column(Text)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    creator_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), index=True)
+    creator = db.relationship("User", back_populates="projects")
+    # Deleting a project deletes its tasks (and their comments); the database does it via ON DELETE CASCADE,
+    # see deletion.py for the set-based delete that also works where foreign keys aren't enforced (SQLite)
+    tasks = db.relationship("Task", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    # Bumped whenever the project or one of its tasks changes (used for the project page's ETag)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    # Set while a large project is being deleted in the background; the project is hidden meanwhile
+    pending_delete: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+
+# Task Table
+class Task(db.Model):
+    __tablename__ = "tasks"
+    __table_args__ = (
+        # "My tasks" lists filter on assignee and status, then page through one of the three sort orders
+        # (the id is included so keyset pagination can seek straight to the next page)
+        Index("ix_tasks_assignee_open_due", "assignee_id", "is_complete", "due_date", "id"),
+        Index("ix_tasks_assignee_open_project", "assignee_id", "is_complete", "project_id", "id"),
+        Index("ix_tasks_assignee_open_creator", "assignee_id", "is_complete", "creator_id", "id"),
+        # Project pages page through a project's open and completed tasks separately
+        Index("ix_tasks_project_open", "project_id", "is_complete", "id"),
+        # The archive job looks for tasks completed before a cutoff
+        Index("ix_tasks_completed_at", "completed_at"),
+        # The reminder job looks for open tasks due in a window of days
+        Index("ix_tasks_open_due", "is_complete", "due_date", "id"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    task_text: Mapped[str] = mapped_column(String(100), nullable=False)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
+    is_complete: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # When the task was last marked complete (UTC, set by archive.py); completed tasks move to the archive after a while
+    completed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    creator_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), index=True)
+    creator = db.relationship("User", foreign_keys=[creator_id])
+    # active_history keeps the previous assignee/project in the attribute history so the project members
+    # can be updated when a task is reassigned
+    assignee_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), active_history=True)
+    assignee = db.relationship("User", foreign_keys=[assignee_id])
+    project_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("projects.id", ondelete="CASCADE"), active_history=True)
+    project = db.relationship("Project", back_populates="tasks")
+    comments = db.relationship("Comment", back_populates="task", cascade="all, delete-orphan", passive_deletes=True)
+    # Bumped whenever the task or one of its comments changes (used for the task page's ETag)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
+# Comment Table
+class Comment(db.Model):
+    __tablename__ = "comments"
+    __table_args__ = (
+        # Task pages page through a task's comments newest first
+        Index("ix_comments_task_id_id", "task_id", "id"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    comment_text: Mapped[str] = mapped_column(String(100), nullable=False)
+    comment_author_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
+    comment_author = db.relationship("User", back_populates="comments")
+    task_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("tasks.id", ondelete="CASCADE"))
+    task = db.relationship("Task", back_populates="comments")
+
+# Project Member Table (everyone allowed to open a project: its creator and the creators/assignees of its tasks)
+class ProjectMember(db.Model):
+    __tablename__ = "project_members"
+    project_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), primary_key=True, index=True)
+    is_creator: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Number of the project's tasks that reference the user (once as creator, once as assignee)
+    task_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+# Task Count Table (how many tasks each assignee has per project, due date and state, kept in step with the tasks)
+# Overdue depends on the day, so the due date is kept and the dashboards sum the rows due before today
+class TaskCount(db.Model):
+    __tablename__ = "task_counts"
+    project_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    assignee_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), primary_key=True)
+    due_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    is_complete: Mapped[bool] = mapped_column(Boolean, primary_key=True)
+    task_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    __table_args__ = (Index("ix_task_counts_assignee_id", "assignee_id", "is_complete", "due_date"),)
+
+# Archived Task Table (completed tasks moved out of the tasks table by `flask --app main archive-tasks`)
+class ArchivedTask(db.Model):
+    __tablename__ = "archived_tasks"
+    __table_args__ = (
+        # The project page pages through a project's archived tasks, newest first
+        Index("ix_archived_tasks_project_id_id", "project_id", "id"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # The id the task had in the tasks table
+    task_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    task_text: Mapped[str] = mapped_column(String(100), nullable=False)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
+    completed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    creator_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
+    creator = db.relationship("User", foreign_keys=[creator_id])
+    assignee_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
+    assignee = db.relationship("User", foreign_keys=[assignee_id])
+    project_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("projects.id", ondelete="CASCADE"))
+    project = db.relationship("Project")
+    comments = db.relationship("ArchivedComment", back_populates="task", cascade="all, delete-orphan", passive_deletes=True)
+
+# Archived Comment Table (the comments of the archived tasks)
+class ArchivedComment(db.Model):
+    __tablename__ = "archived_comments"
+    __table_args__ = (
+        Index("ix_archived_comments_task_id_id", "task_id", "id"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    comment_text: Mapped[str] = mapped_column(String(100), nullable=False)
+    comment_author_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"))
+    comment_author = db.relationship("User")
+    task_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("archived_tasks.id", ondelete="CASCADE"))
+    task = db.relationship("ArchivedTask", back_populates="comments")
+
+# Reminder Log Table (the reminders `flask --app main send-reminders` has sent, so a task gets each kind once per due date)
+# Rows for tasks that have since been deleted are left behind and pruned once their due date leaves the reminder window
+class ReminderLog(db.Model):
+    __tablename__ = "reminder_log"
+    task_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # "due_soon" or "overdue"
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    due_date: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+    assignee_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -0,0 +1,81 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import date
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy import tuple_
+
+from models import db
+
+# One page of results and the cursor for the page after it (None on the last page)
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+def encode_cursor(values):
+
+    # Dates are not JSON serializable, so store them in ISO format
+    values = [value.isoformat() if isinstance(value, date) else value for value in values]
+
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, columns):
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+
+        # Turn ISO strings back into dates for date columns
+        return [
+            date.fromisoformat(value) if column.type.python_type is date else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, UnicodeError, NotImplementedError):
+        return abort(400)
+
+
+def get_page_size():
+
+    # Use the configured page size unless the request asks for a smaller/larger one (capped at MAX_PAGE_SIZE)
+    page_size = request.args.get("per_page", current_app.config["PAGE_SIZE"], type=int)
+
+    return max(1, min(page_size, current_app.config["MAX_PAGE_SIZE"]))
+
+
+def keyset_page(statement, columns, cursor=None, page_size=None, descending=False):
+    """Return one Page of statement's results ordered by columns (in reverse if descending).
+
+    The last column must be unique (normally the primary key) so that every row has a distinct
+    position. The next page starts strictly after the last row of this one, so deep pages cost
+    the same as the first page instead of scanning and discarding an OFFSET.
+    """
+
+    if page_size is None:
+        page_size = get_page_size()
+
+    if cursor:
+        key, position = tuple_(*columns), tuple_(*decode_cursor(cursor, columns))
+        statement = statement.where(key < position if descending else key > position)
+
+    order_by = [column.desc() for column in columns] if descending else columns
+
+    # Fetch one extra row to find out whether there is a next page
+    items = db.session.execute(statement.order_by(*order_by).limit(page_size + 1)).unique().scalars().all()
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+
+    return Page(items=items, next_cursor=next_cursor)
+
+
+def url_for_page(**changes):
+
+    # Link to the current page with some query parameters changed (e.g. the cursor)
+    args = request.args.to_dict()
+    args.update(changes)
+
+    return url_for(request.endpoint, **request.view_args, **args)
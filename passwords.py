@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+import metrics
+
+hashing_time = metrics.registry.histogram("todo_password_hash_seconds", "Time spent hashing or verifying a password.")
+
+
+def full_method(method):
+
+    # The method as werkzeug writes it into hashes, with its defaults filled in ("scrypt" becomes
+    # "scrypt:32768:8:1", "pbkdf2" becomes "pbkdf2:sha256:1000000"), worked out without hashing anything
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        args = ["32768", "8", "1"]
+    elif name == "pbkdf2":
+        if not args:
+            args = ["sha256"]
+        if len(args) == 1:
+            args.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return ":".join([name, *args])
+
+
+def parse_method(method):
+
+    # "pbkdf2:sha256:1000000" -> ("pbkdf2:sha256", (1000000,)), "scrypt:32768:8:1" -> ("scrypt", (32768, 8, 1))
+    names, costs = [], []
+    for part in method.split(":"):
+        (costs if part.isdigit() else names).append(part)
+    return ":".join(names), tuple(int(cost) for cost in costs)
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a small pool of worker processes.
+
+    Key stretching is deliberately CPU heavy, so running it in a bounded pool keeps a burst of logins
+    from tying up every request thread, and caps how many CPUs hashing can take at once. With
+    max_workers=0 the work runs in the calling process instead (handy for tests and the CLI).
+
+    method is any werkzeug method including its cost, e.g. "pbkdf2:sha256:1000000" or "scrypt:32768:8:1".
+    Hashes made with other parameters still verify, and needs_rehash tells when to upgrade them (it
+    never trades a stronger hash for a weaker one).
+    """
+
+    def __init__(self, method="pbkdf2:sha256:1000000", salt_length=16, max_workers=2):
+        self.method = method
+        self.salt_length = salt_length
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._method = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+
+        # Take the settings from PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH and PASSWORD_HASH_WORKERS
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self.salt_length = app.config.get("PASSWORD_SALT_LENGTH", self.salt_length)
+        self.max_workers = app.config.get("PASSWORD_HASH_WORKERS", self.max_workers)
+        self._method = None
+
+    def _get_executor(self):
+        with self._lock:
+            # Start the pool lazily, and again in each forked worker (pools can't be shared across a fork)
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, operation, function, *args):
+        started = time.perf_counter()
+
+        try:
+            if not self.max_workers:
+                return function(*args)
+            try:
+                return self._get_executor().submit(function, *args).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a new pool next time and finish this one here
+                with self._lock:
+                    self._executor = None
+                return function(*args)
+        finally:
+            hashing_time.observe(time.perf_counter() - started, operation=operation, method=self.method.split(":")[0])
+
+    def hash(self, password):
+        return self._run("hash", generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run("verify", check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+
+        # Hashes look like "<method>$<salt>$<hash>", with werkzeug's defaults filled into the method
+        if self._method is None:
+            self._method = parse_method(full_method(self.method))
+
+        method, _, rest = pwhash.partition("$")
+        salt = rest.partition("$")[0]
+        algorithm, cost = parse_method(method)
+        configured_algorithm, configured_cost = self._method
+
+        # Moving to another algorithm (or hash function) is the configuration's call
+        if algorithm != configured_algorithm or len(cost) != len(configured_cost):
+            return True
+        # Same algorithm: never lower a cost parameter, and upgrade when a cost or the salt falls short
+        if any(old > new for old, new in zip(cost, configured_cost)):
+            return False
+        return cost != configured_cost or len(salt) < self.salt_length
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,140 @@
+"""Email-style digests of each user's tasks that are due soon or overdue. Run it from cron:
+
+    flask --app main send-reminders
+
+Pending reminders for all users come from one indexed query over the open tasks due between
+REMINDER_OVERDUE_DAYS ago and REMINDER_DAYS_AHEAD from today, leaving out the ones in the reminder
+log. They are grouped into one digest per assignee and handed to the notifier named by
+REMINDER_NOTIFIER ("module:function", called with the digest). Each digest is logged and committed
+as soon as it is sent, so a task gets each kind of reminder once per due date, and a run that stops
+half way resends at most one digest when it is run again.
+
+print_digest and write_digest stand in for email locally; write_digest appends the digests as JSON
+lines to REMINDER_OUTBOX.
+"""
+import json
+import os
+from datetime import date, timedelta
+from itertools import groupby
+
+import click
+from flask import current_app
+from sqlalchemy import select, delete, insert, exists, case, literal
+from werkzeug.utils import import_string
+
+from models import db, User, Project, Task, ReminderLog
+from archive import utcnow
+
+# Assignees whose reminders are loaded per query
+BATCH_SIZE = 500
+
+
+def print_digest(digest):
+    click.echo(f"To: {digest['user']['name']} <{digest['user']['email']}>")
+    for kind, heading in (("overdue", "Overdue"), ("due_soon", "Due soon")):
+        if digest[kind]:
+            click.echo(f"  {heading}:")
+        for task in digest[kind]:
+            click.echo(f"    {task['due_date']}  {task['text']} ({task['project']})")
+
+
+def write_digest(digest):
+    path = current_app.config["REMINDER_OUTBOX"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(digest) + "\n")
+
+
+def pending_reminders(today, days_ahead, overdue_days):
+
+    # Open tasks in the window that haven't had this kind of reminder for their current due date
+    kind = case((Task.due_date < today, literal("overdue")), else_=literal("due_soon"))
+
+    return (
+        select(
+            Task.assignee_id,
+            Task.id.label("task_id"),
+            Task.task_text,
+            Task.due_date,
+            Task.project_id,
+            Project.title.label("project_title"),
+            kind.label("kind"),
+        )
+        .join(Project, Project.id == Task.project_id)
+        .where(
+            Task.is_complete == False,
+            Task.due_date.between(today - timedelta(days=overdue_days), today + timedelta(days=days_ahead)),
+            Task.assignee_id.is_not(None),
+            Project.pending_delete == False,
+            ~exists().where(ReminderLog.task_id == Task.id, ReminderLog.kind == kind, ReminderLog.due_date == Task.due_date),
+        )
+    )
+
+
+def _digest(user, rows):
+    digest = {"user": {"id": user.id, "name": user.name, "email": user.email}, "overdue": [], "due_soon": []}
+    for row in rows:
+        digest[row.kind].append({
+            "id": row.task_id,
+            "text": row.task_text,
+            "due_date": row.due_date.isoformat(),
+            "project_id": row.project_id,
+            "project": row.project_title,
+        })
+    return digest
+
+
+def send_reminders(notify, today=None, days_ahead=None, overdue_days=None, batch_size=BATCH_SIZE):
+    """Send every pending digest and return how many were sent."""
+
+    if today is None:
+        today = date.today()
+    if days_ahead is None:
+        days_ahead = current_app.config["REMINDER_DAYS_AHEAD"]
+    if overdue_days is None:
+        overdue_days = current_app.config["REMINDER_OVERDUE_DAYS"]
+
+    # Reminders for due dates that left the window can't be sent again, so their log rows can go
+    db.session.execute(delete(ReminderLog).where(ReminderLog.due_date < today - timedelta(days=overdue_days)))
+    db.session.commit()
+
+    pending = pending_reminders(today, days_ahead, overdue_days).subquery()
+    sent = 0
+    after = 0
+
+    while True:
+        assignee_ids = db.session.scalars(
+            select(pending.c.assignee_id).distinct().where(pending.c.assignee_id > after).order_by(pending.c.assignee_id).limit(batch_size)
+        ).all()
+        if not assignee_ids:
+            return sent
+
+        users = {user.id: user for user in db.session.execute(select(User.id, User.name, User.email).where(User.id.in_(assignee_ids)))}
+        rows = db.session.execute(
+            select(pending).where(pending.c.assignee_id.in_(assignee_ids)).order_by(pending.c.assignee_id, pending.c.due_date, pending.c.task_id)
+        ).all()
+
+        for assignee_id, user_rows in groupby(rows, key=lambda row: row.assignee_id):
+            user_rows = list(user_rows)
+            notify(_digest(users[assignee_id], user_rows))
+
+            db.session.execute(insert(ReminderLog), [
+                {"task_id": row.task_id, "kind": row.kind, "due_date": row.due_date, "assignee_id": assignee_id, "sent_at": utcnow()}
+                for row in user_rows
+            ])
+            db.session.commit()
+            sent += 1
+
+        after = assignee_ids[-1]
+
+
+def init_app(app):
+
+    @app.cli.command("send-reminders")
+    @click.option("--days-ahead", type=int, help="Remind about tasks due within this many days (default: REMINDER_DAYS_AHEAD).")
+    @click.option("--notifier", help='"module:function" to send each digest with (default: REMINDER_NOTIFIER).')
+    def send_reminders_command(days_ahead, notifier):
+        """Send each user a digest of their tasks that are due soon or overdue."""
+        notify = import_string(notifier or app.config["REMINDER_NOTIFIER"])
+
+        click.echo(f"sent {send_reminders(notify, days_ahead=days_ahead)} digests")
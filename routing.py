@@ -0,0 +1,99 @@
+"""Send the reads of read-only requests to a replica database.
+
+With REPLICA_DB_URI set, the SELECTs of GET requests to views marked with @reads_from_replica go to the
+replica; everything else (writes, flushes, other views, CLI commands, background jobs) uses the primary.
+
+Replicas lag behind, so a browser that has just written reads from the primary for the next
+REPLICA_STICKY_SECONDS (read-your-writes), and a request switches to the primary as soon as it writes.
+
+Two SQLite files work as a local stand-in, copying the primary over with:
+
+    flask --app main sync-replica
+"""
+import sqlite3
+import time
+
+import click
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA = "replica"
+
+
+def reads_from_replica(view):
+
+    # Mark a view whose GET requests may read from the replica (put it right under @app.route)
+    view.reads_from_replica = True
+    return view
+
+
+def _mark_written():
+    if has_request_context():
+        g.database_written = True
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get("use_replica") and not g.get("database_written"):
+            if getattr(clause, "is_select", False):
+                return self._db.engines[REPLICA]
+            if getattr(clause, "is_dml", False):
+                # A set-based write: this and every later statement of the request go to the primary
+                _mark_written()
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# Registered once here rather than in init_app, which runs for every app created
+@event.listens_for(RoutingSession, "after_flush")
+def record_write(session, flush_context):
+    _mark_written()
+
+
+def _sync_sqlite(source_url, target_url):
+
+    # Copy one SQLite database over another with the online backup API
+    source = sqlite3.connect(source_url.database)
+    target = sqlite3.connect(target_url.database)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def init_app(app, db):
+
+    app.config.setdefault("REPLICA_STICKY_SECONDS", 5.0)
+
+    @app.before_request
+    def choose_database():
+        view = app.view_functions.get(request.endpoint)
+
+        g.use_replica = (
+            REPLICA in db.engines
+            and request.method in ("GET", "HEAD")
+            and getattr(view, "reads_from_replica", False)
+            # Read your own writes: stay on the primary until the replica has caught up
+            and time.time() - session.get("database_written_at", 0) > app.config["REPLICA_STICKY_SECONDS"]
+        )
+
+    @app.after_request
+    def remember_write(response):
+        if g.get("database_written"):
+            session["database_written_at"] = time.time()
+        return response
+
+    @app.cli.command("sync-replica")
+    def sync_replica():
+        """Copy the primary database to the replica (SQLite only, for trying replicas out locally)."""
+        primary, replica = db.engines[None].url, db.engines.get(REPLICA)
+        if replica is None:
+            raise click.UsageError("REPLICA_DB_URI is not set")
+        if primary.get_backend_name() != "sqlite" or replica.url.get_backend_name() != "sqlite":
+            raise click.UsageError("only SQLite databases can be synced; use the database's own replication")
+
+        _sync_sqlite(primary, replica.url)
+        click.echo(f"copied {primary.database} to {replica.url.database}")
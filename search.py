@@ -0,0 +1,134 @@
+import re
+
+from sqlalchemy import MetaData, Table, Column, Integer, BigInteger, String, Text, select, case, and_, event, func, column, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import Engine
+
+from models import db, Project, Task, Comment, ProjectMember
+from pagination import Page, encode_cursor, decode_cursor, get_page_size
+
+# The full-text index over task text, project titles/descriptions and comments. It is created and kept in
+# sync by database triggers (see the search index migration), so it covers every write, including the
+# set-based ones. SQLite uses an FTS5 table and Postgres a table with a GIN-indexed tsvector.
+#
+# Each row's id is derived from the indexed object: tasks are id * 3, projects id * 3 + 1 and comments
+# id * 3 + 2, so the triggers can find a row without scanning the index.
+#
+# The tables live in their own MetaData so that create_all and autogenerate leave them alone.
+sqlite_search_index = Table(
+    "search_index",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("body", Text),
+    Column("kind", String(10)),
+    Column("object_id", Integer),
+    Column("task_id", Integer),
+)
+
+postgres_search_index = Table(
+    "search_index",
+    MetaData(),
+    Column("id", BigInteger, primary_key=True),
+    Column("kind", String(10)),
+    Column("object_id", Integer),
+    Column("task_id", Integer),
+    Column("document", TSVECTOR),
+)
+
+SEARCH_CONFIG = "english"
+
+# Descriptions and comments are HTML from the editor; Postgres indexes them with regexp_replace(body, '<[^>]*>', ' ', 'g')
+TAG_PATTERN = re.compile(r"<[^>]*>")
+
+
+def strip_tags(text):
+    return None if text is None else TAG_PATTERN.sub(" ", text)
+
+
+@event.listens_for(Engine, "connect")
+def register_sqlite_functions(dbapi_connection, connection_record):
+
+    # SQLite has no regexp_replace, so its triggers call strip_tags() instead; only SQLite connections
+    # (sqlite3, or the aiosqlite adapter) can define functions
+    if hasattr(dbapi_connection, "create_function"):
+        dbapi_connection.create_function("strip_tags", 1, strip_tags, deterministic=True)
+
+
+def include_name(name, type_, parent_names):
+
+    # Keep autogenerate/`flask db check` from dropping the index (and the FTS5 shadow tables)
+    return not (type_ == "table" and name.startswith("search_index"))
+
+
+def fts5_query(text):
+
+    # Quote every word so punctuation and FTS5 operators in the search box are matched literally,
+    # and match the last word as a prefix since people search while typing
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return None
+
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search(text, user_id, cursor=None, page_size=None):
+    """Return one Page of the tasks, projects and comments matching text that user_id can see.
+
+    The index does the matching and ranking, and the collaborator check is a join against project_members,
+    so only one page of results is ever loaded.
+    """
+
+    if page_size is None:
+        page_size = get_page_size()
+
+    # Ranked results can't be seeked by key, so the cursor holds the offset of the next page
+    offset = max(0, decode_cursor(cursor, [column("offset", Integer)])[0]) if cursor else 0
+
+    if db.engine.dialect.name == "postgresql":
+        index = postgres_search_index
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        matches = index.c.document.bool_op("@@")(query)
+        # Higher ts_rank is better
+        order_by = [func.ts_rank(index.c.document, query).desc(), index.c.id]
+    else:
+        index = sqlite_search_index
+        text = fts5_query(text)
+        if text is None:
+            return Page(items=[], next_cursor=None)
+        matches = index.c.body.match(text)
+        # Lower bm25 is better
+        order_by = [func.bm25(literal_column("search_index")), index.c.rowid]
+
+    # Projects are indexed by their own id; tasks and comments find their project through the task
+    project_id = case((index.c.kind == "project", index.c.object_id), else_=Task.project_id)
+
+    statement = (
+        select(
+            index.c.kind,
+            index.c.object_id,
+            index.c.task_id,
+            project_id.label("project_id"),
+            Project.title.label("project_title"),
+            Task.task_text,
+            Comment.comment_text,
+        )
+        .select_from(index)
+        .outerjoin(Task, Task.id == index.c.task_id)
+        .join(ProjectMember, and_(ProjectMember.project_id == project_id, ProjectMember.user_id == user_id))
+        .join(Project, Project.id == project_id)
+        .outerjoin(Comment, and_(index.c.kind == "comment", Comment.id == index.c.object_id))
+        .where(matches)
+        .order_by(*order_by)
+        .offset(offset)
+        # Fetch one extra row to find out whether there is a next page
+        .limit(page_size + 1)
+    )
+
+    items = db.session.execute(statement).all()
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor([offset + page_size])
+
+    return Page(items=items, next_cursor=next_cursor)
@@ -25,6 +25,89 @@ window.addEventListener('DOMContentLoaded', event => {
 
 });
 
+// Partial page updates: links with data-ajax-post/data-ajax-get and forms with data-ajax-form are sent with fetch
+// and the returned fragments are swapped into the page (without JavaScript they fall back to the normal routes)
+const csrfToken = () => {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    const input = document.querySelector('input[name="csrf_token"]');
+    return meta ? meta.content : (input ? input.value : '');
+};
+
+const ajaxRequest = (url, options) => fetch(url, {
+    headers: {'X-CSRFToken': csrfToken(), 'Accept': 'application/json'},
+    credentials: 'same-origin',
+    ...options,
+}).then(response => response.json().then(data => {
+    if (!response.ok) {
+        throw data;
+    }
+    return data;
+}));
+
+// A request the server answered with an error wasn't applied, so it's safe to send again the normal way;
+// after a network error or a failure handling the response it may have been applied already
+const wasRejected = error => !(error instanceof Error);
+
+const applyFragments = data => {
+    // Replace elements by id (an empty fragment removes the element)
+    Object.entries(data.replace || {}).forEach(([id, html]) => {
+        const element = document.getElementById(id);
+        if (element) {
+            element.outerHTML = html;
+        }
+    });
+    // Add fragments to the start or the end of elements
+    [['prepend', 'afterbegin'], ['append', 'beforeend']].forEach(([key, position]) => {
+        Object.entries(data[key] || {}).forEach(([id, html]) => {
+            const element = document.getElementById(id);
+            if (element) {
+                element.insertAdjacentHTML(position, html);
+            }
+        });
+    });
+};
+
+document.addEventListener('click', event => {
+    const link = event.target.closest('[data-ajax-post], [data-ajax-get]');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    const request = link.dataset.ajaxPost ? ajaxRequest(link.dataset.ajaxPost, {method: 'POST'}) : ajaxRequest(link.dataset.ajaxGet, {method: 'GET'});
+    request.then(applyFragments).catch(error => {
+        if (link.dataset.ajaxGet || wasRejected(error)) {
+            window.location = link.href;
+        } else {
+            // Following the link could repeat the action (e.g. toggle a task back), so show the current state instead
+            window.location.reload();
+        }
+    });
+});
+
+document.addEventListener('submit', event => {
+    const form = event.target.closest('form[data-ajax-form]');
+    if (!form) {
+        return;
+    }
+    event.preventDefault();
+
+    // Copy the CKEditor contents back into the form's textareas before sending them
+    const editors = window.CKEDITOR ? Object.values(CKEDITOR.instances).filter(editor => form.contains(editor.element.$)) : [];
+    editors.forEach(editor => editor.updateElement());
+
+    ajaxRequest(form.dataset.ajaxForm, {method: 'POST', body: new FormData(form)}).then(data => {
+        applyFragments(data);
+        editors.forEach(editor => editor.setData(''));
+    }).catch(error => {
+        if (wasRejected(error)) {
+            // Let the server render the errors
+            form.submit();
+        } else {
+            window.location.reload();
+        }
+    });
+});
+
 //Dynamic Date
 const date = new Date();
 const currentYear = date.getFullYear();
@@ -46,3 +129,181 @@ document.getElementById("current-year").innerHTML = currentYear;
 document.getElementById("greeting").innerHTML = greeting;
 document.getElementById("current-weekday").innerHTML = weekdays[date.getDay()];
 document.getElementById("current-date").innerHTML = `${currentDay} ${months[currentMonth]} ${currentYear}`;
+
+// Assignee typeahead: suggest users while an email or name is typed and put the chosen user's id in the hidden field
+document.querySelectorAll('[data-user-search]').forEach(input => {
+    const hidden = document.getElementById(input.dataset.userSearch);
+    const options = document.createElement('datalist');
+    options.id = input.getAttribute('list');
+    input.after(options);
+
+    let users = [];
+    let timer = null;
+
+    const choose = () => {
+        // Only an email picked from the suggestions sets the id
+        const user = users.find(user => user.email === input.value);
+        hidden.value = user ? user.id : '';
+    };
+
+    input.addEventListener('input', () => {
+        choose();
+        clearTimeout(timer);
+        if (!input.value.trim()) {
+            return;
+        }
+        timer = setTimeout(() => {
+            fetch(`${input.dataset.searchUrl}?q=${encodeURIComponent(input.value.trim())}`, {credentials: 'same-origin'})
+                .then(response => response.json())
+                .then(data => {
+                    users = data.users;
+                    options.replaceChildren(...users.map(user => new Option(user.name, user.email)));
+                    choose();
+                });
+        }, 150);
+    });
+});
+
+// Project analytics: the first click loads the figures and draws them as SVG charts
+const CHART = {width: 420, height: 260, top: 44, right: 40, bottom: 28, left: 40};
+const CHART_COLOURS = {primary: '#0d6efd', secondary: '#6c757d', success: '#198754', danger: '#dc3545', muted: '#ced4da'};
+
+const svgElement = (name, attributes = {}, text = null) => {
+    const element = document.createElementNS('http://www.w3.org/2000/svg', name);
+    Object.entries(attributes).forEach(([key, value]) => element.setAttribute(key, value));
+    if (text !== null) {
+        element.textContent = text;
+    }
+    return element;
+};
+
+// An empty chart with its title, legend and value axis; returns the SVG and the plot area
+const chartFrame = (title, legend, maxValue, left = CHART.left) => {
+    const {width, height, top, right, bottom} = CHART;
+    const root = svgElement('svg', {viewBox: `0 0 ${width} ${height}`, role: 'img', 'aria-label': title, class: 'w-100', 'font-size': 11});
+    const plot = {left, right: width - right, top, bottom: height - bottom};
+    plot.y = value => plot.bottom - (plot.bottom - plot.top) * value / (maxValue || 1);
+
+    root.append(svgElement('text', {x: 0, y: 14, 'font-weight': 'bold', 'font-size': 13}, title));
+    let x = 0;
+    legend.forEach(([label, colour]) => {
+        root.append(svgElement('rect', {x, y: 22, width: 10, height: 10, fill: colour}));
+        root.append(svgElement('text', {x: x + 14, y: 31}, label));
+        x += 24 + label.length * 6;
+    });
+    return {root, plot};
+};
+
+const valueAxis = (root, plot, maxValue) => {
+    [0, Math.round(maxValue / 2), maxValue].forEach(value => {
+        root.append(svgElement('line', {x1: plot.left, x2: plot.right, y1: plot.y(value), y2: plot.y(value), stroke: CHART_COLOURS.muted}));
+        root.append(svgElement('text', {x: plot.left - 4, y: plot.y(value) + 4, 'text-anchor': 'end'}, value));
+    });
+};
+
+// The first, middle and last labels of a time axis
+const timeAxis = (root, plot, labels, x) => {
+    [...new Set([0, Math.floor((labels.length - 1) / 2), labels.length - 1])].forEach(index => {
+        root.append(svgElement('text', {x: x(index), y: plot.bottom + 16, 'text-anchor': 'middle'}, labels[index]));
+    });
+};
+
+// A line through the values, broken where a value is null
+const linePath = (values, x, y) => values.map((value, index) => {
+    if (value === null) {
+        return '';
+    }
+    return `${index && values[index - 1] !== null ? 'L' : 'M'}${x(index)},${y(value)}`;
+}).join('');
+
+const burndownChart = series => {
+    const maxValue = Math.max(1, ...series.planned, ...series.remaining.filter(value => value !== null));
+    const {root, plot} = chartFrame('Burndown', [['Remaining', CHART_COLOURS.primary], ['Planned', CHART_COLOURS.secondary]], maxValue);
+    const x = index => plot.left + (plot.right - plot.left) * index / Math.max(1, series.labels.length - 1);
+
+    valueAxis(root, plot, maxValue);
+    timeAxis(root, plot, series.labels, x);
+    root.append(svgElement('path', {d: linePath(series.planned, x, plot.y), fill: 'none', stroke: CHART_COLOURS.secondary, 'stroke-dasharray': '6 4'}));
+    root.append(svgElement('path', {d: linePath(series.remaining, x, plot.y), fill: 'none', stroke: CHART_COLOURS.primary, 'stroke-width': 2}));
+    return root;
+};
+
+const throughputChart = (series, period) => {
+    const maxValue = Math.max(1, ...series.completed.filter(value => value !== null));
+    const {root, plot} = chartFrame('Throughput', [[`Completed per ${period}`, CHART_COLOURS.primary], ['On time', CHART_COLOURS.success]], maxValue);
+    const step = (plot.right - plot.left) / series.labels.length;
+    const x = index => plot.left + step * (index + 0.5);
+    const rateY = rate => plot.bottom - (plot.bottom - plot.top) * rate;
+
+    valueAxis(root, plot, maxValue);
+    timeAxis(root, plot, series.labels, x);
+    ['0%', '50%', '100%'].forEach((label, index) => {
+        root.append(svgElement('text', {x: plot.right + 4, y: rateY(index / 2) + 4}, label));
+    });
+    series.completed.forEach((value, index) => {
+        if (value) {
+            const bar = svgElement('rect', {x: x(index) - step * 0.4, y: plot.y(value), width: step * 0.8, height: plot.bottom - plot.y(value), fill: CHART_COLOURS.primary});
+            bar.append(svgElement('title', {}, `${series.labels[index]}: ${value} completed`));
+            root.append(bar);
+        }
+    });
+    root.append(svgElement('path', {d: linePath(series.on_time_rate, x, rateY), fill: 'none', stroke: CHART_COLOURS.success, 'stroke-width': 2}));
+    return root;
+};
+
+const assigneesChart = assignees => {
+    const segments = [['Completed', 'completed', CHART_COLOURS.primary], ['Open', 'open', CHART_COLOURS.muted], ['Overdue', 'overdue', CHART_COLOURS.danger]];
+    // Overdue tasks are open too, so the open segment shows the rest
+    const values = assignee => ({completed: assignee.completed, open: assignee.open - assignee.overdue, overdue: assignee.overdue});
+    const maxValue = Math.max(1, ...assignees.map(assignee => assignee.completed + assignee.open));
+    const {root, plot} = chartFrame('Per assignee', segments.map(([label, , colour]) => [label, colour]), maxValue, 100);
+    const row = (plot.bottom - plot.top) / Math.max(1, assignees.length);
+    const x = value => plot.left + (plot.right - plot.left) * value / maxValue;
+
+    assignees.forEach((assignee, index) => {
+        const y = plot.top + row * index;
+        root.append(svgElement('text', {x: plot.left - 4, y: y + row / 2 + 4, 'text-anchor': 'end'}, assignee.name.slice(0, 16)));
+        let start = 0;
+        segments.forEach(([label, key, colour]) => {
+            const value = values(assignee)[key];
+            if (value) {
+                const bar = svgElement('rect', {x: x(start), y: y + row * 0.15, width: x(start + value) - x(start), height: row * 0.7, fill: colour});
+                bar.append(svgElement('title', {}, `${assignee.name}: ${value} ${label.toLowerCase()}`));
+                root.append(bar);
+            }
+            start += value;
+        });
+    });
+    return root;
+};
+
+document.querySelectorAll('[data-analytics-url]').forEach(section => {
+    const button = section.querySelector('[data-show-analytics]');
+    const body = section.querySelector('[data-analytics-body]');
+
+    const percent = rate => rate === null ? '–' : `${Math.round(rate * 100)}%`;
+
+    const draw = data => {
+        const chart = name => section.querySelector(`[data-chart="${name}"]`);
+        const period = data.bucket_days === 1 ? 'day' : `${data.bucket_days} days`;
+
+        section.querySelector('[data-analytics-summary]').textContent =
+            `${data.totals.completed} of ${data.totals.tasks} tasks completed (${percent(data.totals.completion_rate)}), ` +
+            `${percent(data.totals.on_time_rate)} on time, ${data.totals.overdue} overdue.`;
+
+        chart('burndown').replaceChildren(burndownChart(data.series));
+        chart('completed').replaceChildren(throughputChart(data.series, period));
+        chart('assignees').replaceChildren(assigneesChart(data.assignees));
+    };
+
+    button.addEventListener('click', () => {
+        button.disabled = true;
+        ajaxRequest(section.dataset.analyticsUrl, {method: 'GET'}).then(data => {
+            button.remove();
+            body.classList.remove('d-none');
+            draw(data);
+        }).catch(() => {
+            button.disabled = false;
+        });
+    });
+});
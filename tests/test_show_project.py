@@ -0,0 +1,93 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from models import db, User, Project, Task
+
+# Statements a project page may run, however many tasks the project has
+MAX_STATEMENTS = 5
+
+
+def make_app(path):
+    app = create_app({
+        "SECRET_KEY": "test",
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "PASSWORD_HASH_WORKERS": 0,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_project(app, task_count):
+
+    # A project whose tasks are spread over 20 assignees and creators, a third of them complete
+    with app.app_context():
+        users = [User(email=f"user{number}@example.com", name=f"User {number}", password="x") for number in range(20)]
+        db.session.add_all(users)
+        db.session.flush()
+
+        project = Project(title="Project", description="", date=date.today(), creator_id=users[0].id)
+        db.session.add(project)
+        db.session.flush()
+
+        db.session.add_all(
+            Task(
+                task_text=f"Task {number}",
+                due_date=date.today() + timedelta(days=number % 30),
+                is_complete=number % 3 == 0,
+                creator_id=users[number % 7].id,
+                assignee_id=users[number % 20].id,
+                project_id=project.id,
+            )
+            for number in range(task_count)
+        )
+        db.session.commit()
+
+        return project.id, users[0].id
+
+
+def count_statements(app, project_id, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+
+    # The logged-in user is cached after their first request, so load it before counting
+    client.get("/")
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(f"/show-project/{project_id}")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize("task_count", [3, 300])
+def test_show_project_query_count_is_bounded(tmp_path, task_count):
+    app = make_app(tmp_path / "test.db")
+
+    assert count_statements(app, *seed_project(app, task_count)) <= MAX_STATEMENTS
+
+
+def test_show_project_query_count_does_not_grow_with_tasks(tmp_path):
+    counts = []
+    for task_count in (3, 300):
+        app = make_app(tmp_path / f"test-{task_count}.db")
+        counts.append(count_statements(app, *seed_project(app, task_count)))
+
+    assert counts[0] == counts[1]
@@ -0,0 +1,283 @@
+"""Export and import projects, tasks and comments as CSV or JSONL.
+
+Exports stream the rows from a server-side cursor and imports insert in batches, so both run in
+constant memory however many rows there are. Users are referred to by email so the files can be
+loaded into another database:
+
+    flask --app main export-data all --format jsonl --output todos.jsonl
+    flask --app main import-data todos.jsonl
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+import click
+from sqlalchemy import select, insert
+from sqlalchemy.orm import aliased
+
+from models import db, User, Project, Task, Comment
+from membership import refresh_project_members
+from counters import refresh_task_counts
+from archive import utcnow
+
+# Rows fetched from the cursor (and inserted) at a time
+BATCH_SIZE = 1000
+
+FIELDS = {
+    "project": ["type", "id", "title", "description", "date", "creator_email"],
+    "task": ["type", "id", "project_id", "task_text", "due_date", "is_complete", "completed_at", "creator_email", "assignee_email"],
+    "comment": ["type", "id", "task_id", "comment_text", "author_email"],
+}
+KINDS = {"projects": ["project"], "tasks": ["task"], "comments": ["comment"], "all": ["project", "task", "comment"]}
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def _export_query(record_type, project_ids=None):
+
+    creator = aliased(User)
+
+    if record_type == "project":
+        query = (
+            select(Project.id, Project.title, Project.description, Project.date, creator.email.label("creator_email"))
+            .join(creator, Project.creator_id == creator.id)
+            .order_by(Project.id)
+        )
+        project_column = Project.id
+
+    elif record_type == "task":
+        assignee = aliased(User)
+        query = (
+            select(
+                Task.id, Task.project_id, Task.task_text, Task.due_date, Task.is_complete, Task.completed_at,
+                creator.email.label("creator_email"), assignee.email.label("assignee_email"),
+            )
+            .join(creator, Task.creator_id == creator.id)
+            .join(assignee, Task.assignee_id == assignee.id)
+            .order_by(Task.id)
+        )
+        project_column = Task.project_id
+
+    else:
+        query = (
+            select(Comment.id, Comment.task_id, Comment.comment_text, creator.email.label("author_email"))
+            .join(creator, Comment.comment_author_id == creator.id)
+            .join(Task, Comment.task_id == Task.id)
+            .order_by(Comment.id)
+        )
+        project_column = Task.project_id
+
+    if project_ids:
+        query = query.where(project_column.in_(project_ids))
+
+    return query
+
+
+def iter_records(kind, project_ids=None):
+
+    # Stream the rows with a server-side cursor, BATCH_SIZE at a time
+    for record_type in KINDS[kind]:
+        query = _export_query(record_type, project_ids).execution_options(stream_results=True, yield_per=BATCH_SIZE)
+        for row in db.session.execute(query).mappings():
+            yield {"type": record_type, **row}
+
+
+def _to_text(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(records, fields):
+
+    # One line of CSV at a time (every record in a CSV file must have the same type)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields, extrasaction="ignore")
+    writer.writeheader()
+
+    for record in records:
+        writer.writerow({key: _to_text(value) for key, value in record.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def iter_jsonl(records):
+    for record in records:
+        yield json.dumps(record, default=_to_text) + "\n"
+
+
+def export_lines(kind, file_format, project_ids=None):
+    if file_format == "csv":
+        if len(KINDS[kind]) > 1:
+            raise ValueError("CSV exports hold one kind of record; use jsonl to export everything")
+        return iter_csv(iter_records(kind, project_ids), FIELDS[KINDS[kind][0]])
+    return iter_jsonl(iter_records(kind, project_ids))
+
+
+def read_records(file):
+
+    # Records from a CSV file (detected by its header) or a JSONL file
+    first_line = file.readline()
+    if not first_line:
+        return
+
+    if first_line.lstrip().startswith("{"):
+        yield json.loads(first_line)
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(file, fieldnames=next(csv.reader([first_line])))
+
+
+class Importer:
+    """Insert exported records in batches.
+
+    Ids in the file are replaced by new ones, so a file can be loaded next to existing data; tasks and
+    comments must come after (or in a file imported after) the projects and tasks they belong to.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        # Every user's id by email, loaded once
+        self.user_ids = dict(db.session.execute(select(User.email, User.id)).all())
+        self.new_ids = {"project": {}, "task": {}}
+        self.pending = {"project": [], "task": [], "comment": []}
+        self.pending_ids = {"project": set(), "task": set()}
+        # Projects whose members and task counters must be rebuilt at the end
+        self.project_ids = set()
+        self.counts = {"project": 0, "task": 0, "comment": 0, "skipped": 0}
+        self.errors = []
+
+    def add(self, record):
+        record_type = record.get("type")
+
+        try:
+            row = self._convert(record_type, record)
+        except (KeyError, TypeError, ValueError) as error:
+            self.counts["skipped"] += 1
+            if len(self.errors) < 100:
+                self.errors.append(f"{record_type} {record.get('id')}: {error}")
+            return
+
+        # Flush the batches in order so the ids that later rows refer to are known
+        self.pending[record_type].append((str(record.get("id")), row))
+        if record_type in self.pending_ids:
+            self.pending_ids[record_type].add(str(record.get("id")))
+        if len(self.pending[record_type]) >= self.batch_size:
+            self.flush()
+
+    def _user_id(self, email):
+        if email not in self.user_ids:
+            raise KeyError(f"unknown user {email}")
+        return self.user_ids[email]
+
+    def _new_id(self, record_type, old_id):
+        # Rows still in a pending batch get their ids when it is inserted
+        if str(old_id) in self.pending_ids[record_type]:
+            self.flush()
+        if str(old_id) not in self.new_ids[record_type]:
+            raise KeyError(f"unknown {record_type} {old_id}")
+        return self.new_ids[record_type][str(old_id)]
+
+    def _convert(self, record_type, record):
+        if record_type == "project":
+            return {
+                "title": record["title"],
+                "description": record.get("description") or "",
+                "date": date.fromisoformat(record["date"]),
+                "creator_id": self._user_id(record["creator_email"]),
+            }
+        if record_type == "task":
+            project_id = self._new_id("project", record["project_id"])
+            self.project_ids.add(project_id)
+            is_complete = record["is_complete"]
+            if isinstance(is_complete, str):
+                is_complete = is_complete.lower() in ("true", "1")
+            # Files exported before completion times were included get the import time instead
+            completed_at = None
+            if is_complete:
+                completed_at = datetime.fromisoformat(record["completed_at"]) if record.get("completed_at") else utcnow()
+            return {
+                "project_id": project_id,
+                "task_text": record["task_text"],
+                "due_date": date.fromisoformat(record["due_date"]),
+                "is_complete": bool(is_complete),
+                "completed_at": completed_at,
+                "creator_id": self._user_id(record["creator_email"]),
+                "assignee_id": self._user_id(record["assignee_email"]),
+            }
+        if record_type == "comment":
+            return {
+                "task_id": self._new_id("task", record["task_id"]),
+                "comment_text": record["comment_text"],
+                "comment_author_id": self._user_id(record["author_email"]),
+            }
+        raise ValueError("unknown record type")
+
+    def flush(self):
+        models = {"project": Project, "task": Task, "comment": Comment}
+
+        for record_type in ("project", "task", "comment"):
+            batch = self.pending[record_type]
+            if not batch:
+                continue
+            self.pending[record_type] = []
+            self.pending_ids.get(record_type, set()).clear()
+
+            ids = db.session.scalars(
+                insert(models[record_type]).returning(models[record_type].id, sort_by_parameter_order=True),
+                [row for _, row in batch],
+            ).all()
+
+            if record_type in self.new_ids:
+                for (old_id, _), new_id in zip(batch, ids):
+                    self.new_ids[record_type][old_id] = new_id
+            self.counts[record_type] += len(batch)
+
+    def finish(self):
+        self.flush()
+
+        # The bulk inserts bypass the ORM events, so build the members and counters of the touched projects here
+        project_ids = self.project_ids | set(self.new_ids["project"].values())
+        refresh_project_members(project_ids)
+        refresh_task_counts(project_ids)
+
+        return self.counts
+
+
+def init_app(app):
+
+    @app.cli.command("export-data")
+    @click.argument("kind", type=click.Choice(list(KINDS)))
+    @click.option("--format", "file_format", type=click.Choice(list(FORMATS)), default="jsonl")
+    @click.option("--project-id", "project_ids", type=int, multiple=True, help="Only export these projects (repeatable).")
+    @click.option("--output", type=click.File("w", encoding="utf-8"), default="-")
+    def export_data(kind, file_format, project_ids, output):
+        """Write projects, tasks and/or comments as CSV or JSONL."""
+        try:
+            for chunk in export_lines(kind, file_format, project_ids):
+                output.write(chunk)
+        except ValueError as error:
+            raise click.UsageError(str(error))
+
+    @app.cli.command("import-data")
+    @click.argument("files", type=click.File("r", encoding="utf-8"), nargs=-1, required=True)
+    @click.option("--batch-size", type=int, default=BATCH_SIZE, show_default=True)
+    def import_data(files, batch_size):
+        """Load files written by export-data, in order, in one transaction."""
+        importer = Importer(batch_size)
+
+        for file in files:
+            for record in read_records(file):
+                importer.add(record)
+
+        counts = importer.finish()
+        db.session.commit()
+
+        for error in importer.errors:
+            click.echo(f"skipped {error}", err=True)
+        click.echo(", ".join(f"{count} {name}" for name, count in counts.items()))
@@ -0,0 +1,46 @@
+from sqlalchemy import event, inspect, update
+
+from models import db, Project, Task, Comment
+
+
+def bump_versions(connection, project_ids=(), task_ids=()):
+
+    # Mark the pages of these projects and tasks as changed (see the ETags in show_project and show_task)
+    project_ids = {project_id for project_id in project_ids if project_id is not None}
+    task_ids = {task_id for task_id in task_ids if task_id is not None}
+
+    if project_ids:
+        connection.execute(update(Project).where(Project.id.in_(project_ids)).values(version=Project.version + 1))
+    if task_ids:
+        connection.execute(update(Task).where(Task.id.in_(task_ids)).values(version=Task.version + 1))
+
+
+@event.listens_for(db.session, "after_flush")
+def record_version_changes(session, flush_context):
+
+    # Every ORM write to a task changes its project's page (task lists) and its own page;
+    # comments only appear on their task's page
+    project_ids = set()
+    task_ids = set()
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Project) and obj not in session.new and obj not in session.deleted:
+            # Only count real changes, not a project that is dirty because a task was added to it
+            if session.is_modified(obj, include_collections=False):
+                project_ids.add(obj.id)
+
+        elif isinstance(obj, Task):
+            state = inspect(obj)
+            if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            project_ids.add(obj.project_id)
+            # A task moved to another project changes both project pages
+            project_ids.update(state.attrs.project_id.history.deleted)
+            if obj not in session.new and obj not in session.deleted:
+                task_ids.add(obj.id)
+
+        elif isinstance(obj, Comment):
+            task_ids.add(obj.task_id)
+            task_ids.update(inspect(obj).attrs.task_id.history.deleted)
+
+    bump_versions(session.connection(), project_ids, task_ids)